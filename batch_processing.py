@@ -0,0 +1,314 @@
+"""Пакетный (неинтерактивный) расчёт фигур из файла.
+
+Записи читаются потоково из CSV или JSONL, по каждой считаются
+характеристики, результаты пишутся в CSV или JSONL и, при необходимости,
+сохраняются в таблицу calculations порциями. Память не зависит от размера
+входного файла. Записи, не прошедшие validate(), не прерывают запуск —
+они попадают в отчёт об ошибках.
+
+Порции могут считаться параллельно в пуле процессов (workers > 1): в
+процессы передаются компактные буферы array('d') с параметрами, а не
+объекты фигур, результаты записываются в порядке входного файла.
+
+Формат входной записи: столбец shape (Rectangle, Triangle, Trapezoid) и
+параметры по именам аргументов конструктора:
+    shape,width,height,a,b,c,base1,base2
+    Rectangle,3,4,,,,,
+    Triangle,,,3,4,5,,
+"""
+import csv
+import json
+import math
+import os
+import time
+from array import array
+from collections import deque
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+import database
+from database import PARAMETER_FORMATS, SHAPE_CLASSES
+from geometry_package import batch
+
+# Код типа фигуры в буфере порции
+SHAPE_TYPES = tuple(SHAPE_CLASSES)
+# Максимальное число параметров у фигуры (ширина строки буфера параметров)
+MAX_FIELDS = max(len(cls.FIELDS) for cls in SHAPE_CLASSES.values())
+
+RESULT_FIELDS = ('line', 'shape', 'parameters', 'area',
+                 'circumscribed_radius', 'inscribed_radius')
+
+# С какого размера порции считать через numpy (на малых порциях дешевле цикл)
+VECTORIZE_MIN_ROWS = 64
+
+
+def _file_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.csv', '.jsonl'):
+        return extension[1:]
+    raise ValueError(f"Неподдерживаемый формат файла: {path} (ожидается .csv или .jsonl)")
+
+
+class MalformedLine(str):
+    """Строка JSONL, которая не разбирается как JSON (текст строки и ошибка)"""
+
+    def __new__(cls, text: str, error: str):
+        line = super().__new__(cls, text.rstrip('\r\n'))
+        line.error = error
+        return line
+
+
+def read_records(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Потоковое чтение записей: (номер строки, запись).
+    Строка JSONL с некорректным JSON возвращается как MalformedLine —
+    parse_record() отклоняет её, и запуск продолжается.
+    """
+    file_format = _file_format(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            # Строка 1 — заголовок
+            for line, record in enumerate(csv.DictReader(f), start=2):
+                yield line, record
+        else:
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    yield line, json.loads(text)
+                except ValueError as e:
+                    yield line, MalformedLine(text, str(e))
+
+
+def parse_record(record: dict) -> tuple:
+    """Тип фигуры и параметры записи; ValueError, если запись некорректна"""
+    if isinstance(record, MalformedLine):
+        raise ValueError(f"Некорректный JSON: {record.error}")
+    if not isinstance(record, dict):
+        raise ValueError("Запись должна быть объектом JSON")
+    shape_type = record.get('shape') or record.get('shape_type')
+    # Тип — строка: список или объект в поле shape нельзя искать в словаре
+    cls = SHAPE_CLASSES.get(shape_type) if isinstance(shape_type, str) else None
+    if cls is None:
+        raise ValueError(f"Неизвестный тип фигуры: {shape_type!r}")
+    try:
+        params = tuple(float(record[name]) for name in cls.FIELDS)
+        if not all(map(math.isfinite, params)):
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Для {shape_type} нужны числовые параметры {', '.join(cls.FIELDS)}")
+    return shape_type, params
+
+
+def encode_chunk(chunk: List[Tuple[int, dict]]) -> tuple:
+    """
+    Порция записей -> (коды типов array('b'), параметры array('d'),
+    индексы разобранных записей, {индекс записи: ошибка разбора}).
+    Параметры лежат построчно по MAX_FIELDS значений.
+    """
+    codes = array('b')
+    params = array('d')
+    accepted = []
+    rejected = {}
+    for index, (_, record) in enumerate(chunk):
+        try:
+            shape_type, values = parse_record(record)
+        except ValueError as e:
+            rejected[index] = str(e)
+            continue
+        accepted.append(index)
+        codes.append(SHAPE_TYPES.index(shape_type))
+        params.extend(values + (math.nan,) * (MAX_FIELDS - len(values)))
+    return codes, params, accepted, rejected
+
+
+def compute_chunk(codes: array, params: array) -> Tuple[array, List[Tuple[int, str]]]:
+    """
+    Характеристики порции: array('d') по три значения на строку
+    (площадь, R, r; NaN — не существует) и список (номер в порции, ошибка).
+    Выполняется как в основном процессе, так и в процессах пула.
+    """
+    if batch.NUMPY_AVAILABLE and len(codes) >= VECTORIZE_MIN_ROWS:
+        return _compute_vectorized(codes, params)
+    metrics = array('d')
+    failed = []
+    for i, code in enumerate(codes):
+        cls = SHAPE_CLASSES[SHAPE_TYPES[code]]
+        start = i * MAX_FIELDS
+        try:
+            shape = cls(*params[start:start + len(cls.FIELDS)])
+        except ValueError as e:
+            metrics.extend((math.nan, math.nan, math.nan))
+            failed.append((i, str(e)))
+            continue
+        metrics.extend(math.nan if v is None else v for v in
+                       (shape.area, shape.circumscribed_radius, shape.inscribed_radius))
+    return metrics, failed
+
+
+def _compute_vectorized(codes: array, params: array) -> Tuple[array, List[Tuple[int, str]]]:
+    """
+    compute_chunk() на numpy: проверка и расчёт по типам фигур целыми
+    столбцами, без исключения на каждую некорректную строку.
+    """
+    np = batch._require_numpy()
+    types = np.frombuffer(codes, dtype=np.int8)
+    table = np.frombuffer(params, dtype=np.float64).reshape(-1, MAX_FIELDS)
+    metrics = np.full((len(types), 3), np.nan)
+    failed = []
+    for code, shape_type in enumerate(SHAPE_TYPES):
+        rows = np.flatnonzero(types == code)
+        if not len(rows):
+            continue
+        columns = table[rows, :len(SHAPE_CLASSES[shape_type].FIELDS)].T
+        validation, result = batch.calculate_valid(shape_type, *columns)
+        metrics[rows] = np.column_stack(result)
+        failed.extend((int(rows[i]), message) for i, message in validation.errors())
+    failed.sort()
+    out = array('d')
+    out.frombytes(metrics.tobytes())
+    return out, failed
+
+
+def decode_rows(codes: array, params: array, metrics: array) -> Iterator[tuple]:
+    """Строки в формате shape_to_row() из буферов порции"""
+    for i, code in enumerate(codes):
+        shape_type = SHAPE_TYPES[code]
+        fields = SHAPE_CLASSES[shape_type].FIELDS
+        values = params[i * MAX_FIELDS:i * MAX_FIELDS + len(fields)]
+        parameters = PARAMETER_FORMATS[shape_type].format(**dict(zip(fields, values)))
+        yield (shape_type, parameters) + tuple(
+            None if v != v else v for v in metrics[i * 3:i * 3 + 3])
+
+
+class ResultWriter:
+    """Потоковая запись результатов в CSV или JSONL"""
+
+    def __init__(self, path: str):
+        self.format = _file_format(path)
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._csv = None
+        if self.format == 'csv':
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(RESULT_FIELDS)
+
+    def write(self, line: int, row: tuple):
+        """row — кортеж shape_to_row()"""
+        if self._csv is not None:
+            self._csv.writerow((line,) + tuple('' if v is None else v for v in row))
+        else:
+            self._file.write(json.dumps(dict(zip(RESULT_FIELDS, (line,) + row)),
+                                        ensure_ascii=False) + '\n')
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ErrorReport:
+    """Отчёт об ошибочных записях в JSONL (файл создаётся при первой ошибке)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def add(self, line: int, error: str, record):
+        if self._file is None:
+            self._file = open(self.path, 'w', encoding='utf-8')
+        self.count += 1
+        self._file.write(json.dumps({'line': line, 'error': error, 'record': record},
+                                    ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def run_batch(input_path: str, output_path: str, errors_path: Optional[str] = None,
+              db: Optional[database.DatabaseManager] = None,
+              chunk_size: int = 10_000, workers: int = 1) -> dict:
+    """
+    Пакетный расчёт файла input_path с записью результатов в output_path.
+    При переданном db результаты сохраняются порциями по chunk_size строк.
+    workers > 1 — расчёт порций в пуле из workers процессов.
+    Возвращает сводку: количество строк, ошибок, время и строк в секунду.
+    """
+    errors = ErrorReport(errors_path or output_path + '.errors.jsonl')
+    records = read_records(input_path)
+    total = 0
+    start = time.perf_counter()
+
+    def finish(chunk, encoded, computed):
+        """Запись результатов и ошибок порции в порядке входного файла"""
+        codes, params, accepted, rejected = encoded
+        metrics, failed = computed
+        for position, message in failed:
+            rejected[accepted[position]] = message
+        results = dict(zip(accepted, decode_rows(codes, params, metrics)))
+
+        rows = []
+        for index, (line, record) in enumerate(chunk):
+            if index in rejected:
+                errors.add(line, rejected[index], record)
+                continue
+            writer.write(line, results[index])
+            rows.append(results[index])
+        if db is not None:
+            db.save_calculations(rows, chunk_size=chunk_size)
+
+    executor = None
+    if workers > 1:
+        # multiprocessing нужен только параллельному режиму
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(workers)
+    # Не больше двух порций на процесс в работе — память остаётся ограниченной
+    pending = deque()
+    try:
+        with ResultWriter(output_path) as writer:
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                total += len(chunk)
+                encoded = encode_chunk(chunk)
+                codes, params = encoded[:2]
+                if executor is None:
+                    finish(chunk, encoded, compute_chunk(codes, params))
+                    continue
+                pending.append((chunk, encoded, executor.submit(compute_chunk, codes, params)))
+                while len(pending) >= 2 * workers:
+                    chunk, encoded, future = pending.popleft()
+                    finish(chunk, encoded, future.result())
+            while pending:
+                chunk, encoded, future = pending.popleft()
+                finish(chunk, encoded, future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        errors.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': total,
+        'ok': total - errors.count,
+        'errors': errors.count,
+        'errors_path': errors.path if errors.count else None,
+        'seconds': seconds,
+        'rows_per_second': total / seconds if seconds else 0.0,
+    }
+
+
+def format_summary(summary: dict) -> str:
+    """Строка сводки для вывода в консоль"""
+    text = (f"Обработано строк: {summary['rows']}, успешно: {summary['ok']}, "
+            f"ошибок: {summary['errors']}, {summary['seconds']:.2f} с "
+            f"({summary['rows_per_second']:,.0f} строк/с)")
+    if summary['errors_path']:
+        text += f"\nОтчёт об ошибках: {summary['errors_path']}"
+    return text
@@ -0,0 +1,156 @@
+"""Нагрузочный тест одновременной работы нескольких процессов с одной БД.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_concurrency [писателей] [читателей] [строк] [строк в транзакции]
+
+Писатели сохраняют прямоугольники со своей шириной (номер писателя + 1) и
+высотой 1..строк, каждый короткими транзакциями. Читатели в снимке
+(DatabaseManager.snapshot) сверяют счётчик calculation_stats с COUNT(*) —
+в согласованном снимке они всегда равны. После остановки проверяется, что
+все подтверждённые записи на месте и нет лишних.
+
+Сравниваются два режима: «без защиты» — журнал отката, busy_timeout=0 и
+без повторов, и режим по умолчанию — WAL, busy_timeout и повтор с паузой.
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from database import DatabaseManager, is_busy_error
+from geometry_package import Rectangle
+
+UNPROTECTED = {'pragmas': {'journal_mode': 'DELETE', 'busy_timeout': 0}, 'busy_retries': 0}
+PROTECTED = {'pragmas': None, 'busy_retries': 8}
+
+
+def _open(path: str, options: dict) -> Optional[DatabaseManager]:
+    """Менеджер процесса; None, если БД занята уже при подключении"""
+    try:
+        return DatabaseManager(path, **options)
+    except (sqlite3.OperationalError, ConnectionError):
+        return None
+
+
+def _writer(path: str, index: int, rows: int, chunk: int, options: dict, start, results):
+    db = _open(path, options)
+    written, errors = 0, int(db is None)
+    start.wait()
+    began = time.perf_counter()
+    try:
+        for first in range(1, rows + 1, chunk) if db else ():
+            shapes = [Rectangle(index + 1, height)
+                      for height in range(first, min(first + chunk, rows + 1))]
+            try:
+                db.save_calculations(shapes)
+                written += len(shapes)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e):
+                    raise
+                errors += 1
+    finally:
+        results.put(('writer', written, errors, db.busy_retry_count if db else 0,
+                     time.perf_counter() - began))
+        if db:
+            db.close()
+
+
+def _reader(path: str, options: dict, start, stop, results):
+    db = _open(path, options)
+    reads, errors, inconsistent = 0, int(db is None), 0
+    start.wait()
+    began = time.perf_counter()
+    try:
+        while db and not stop.is_set():
+            try:
+                with db.snapshot() as conn:
+                    counted = db.count_calculations()
+                    actual = conn.execute("SELECT COUNT(*) FROM calculations").fetchone()[0]
+                inconsistent += counted != actual
+                reads += 1
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e):
+                    raise
+                errors += 1
+        stop.wait()
+    finally:
+        results.put(('reader', reads, errors, inconsistent, time.perf_counter() - began))
+        if db:
+            db.close()
+
+
+def run(path: str, writers: int = 4, readers: int = 2, rows: int = 2000, chunk: int = 1,
+        options: dict = PROTECTED) -> dict:
+    """Прогон на новой БД path; сводка пропускной способности и проверок"""
+    # Схему создаёт менеджер из interface (как при первом запуске приложения)
+    from interface import DatabaseManager as AppDatabaseManager
+    AppDatabaseManager(path, **options).close()
+
+    context = multiprocessing.get_context()
+    start, stop, results = context.Event(), context.Event(), context.Queue()
+    writer_processes = [context.Process(target=_writer, args=(path, i, rows, chunk, options,
+                                                              start, results))
+                        for i in range(writers)]
+    reader_processes = [context.Process(target=_reader, args=(path, options, start, stop, results))
+                        for _ in range(readers)]
+    for process in writer_processes + reader_processes:
+        process.start()
+    began = time.perf_counter()
+    start.set()
+    reports = [results.get() for _ in writer_processes]
+    seconds = time.perf_counter() - began
+    stop.set()
+    reports += [results.get() for _ in reader_processes]
+    for process in writer_processes + reader_processes:
+        process.join()
+
+    written = sum(r[1] for r in reports if r[0] == 'writer')
+    with DatabaseManager(path) as db:
+        conn = db._connect()
+        stored = conn.execute("SELECT COUNT(*) FROM calculations").fetchone()[0]
+        distinct = conn.execute(
+            "SELECT COUNT(DISTINCT param1 || ':' || param2) FROM calculations").fetchone()[0]
+        drift = db.verify_statistics()
+    return {
+        'writers': writers, 'readers': readers, 'seconds': seconds,
+        'written': written,
+        'attempted': writers * rows,
+        'write_errors': sum(r[2] for r in reports if r[0] == 'writer'),
+        'retries': sum(r[3] for r in reports if r[0] == 'writer'),
+        'rows_per_second': written / seconds,
+        'reads': sum(r[1] for r in reports if r[0] == 'reader'),
+        'read_errors': sum(r[2] for r in reports if r[0] == 'reader'),
+        'inconsistent_reads': sum(r[3] for r in reports if r[0] == 'reader'),
+        'reads_per_second': sum(r[1] / r[4] for r in reports if r[0] == 'reader' and r[4]),
+        # Подтверждённые записи совпадают с сохранёнными, повторов строк нет
+        'lost': written - distinct,
+        'duplicates': stored - distinct,
+        'stats_drift': len(drift),
+    }
+
+
+MODES = (("без защиты", UNPROTECTED), ("WAL+повтор", PROTECTED))
+
+
+def main(writers: int = 4, readers: int = 2, rows: int = 2000, chunk: int = 1):
+    print(f"{writers} писателей по {rows} строк ({chunk} в транзакции), {readers} читателей")
+    print(f"{'режим':>12} {'строк/с':>9} {'чтений/с':>9} {'ошибок зап.':>11} "
+          f"{'ошибок чт.':>10} {'повторов':>8} {'не сохр.':>8} {'потеряно':>8} {'несогл.':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for number, (name, options) in enumerate(MODES):
+            r = run(os.path.join(tmp, f"mode{number}.db"), writers, readers, rows, chunk, options)
+            print(f"{name:>12} {r['rows_per_second']:>9,.0f} {r['reads_per_second']:>9,.0f} "
+                  f"{r['write_errors']:>11} {r['read_errors']:>10} {r['retries']:>8} "
+                  f"{r['attempted'] - r['written']:>8} {r['lost']:>8} "
+                  f"{r['inconsistent_reads']:>7}")
+            if options is PROTECTED and (r['written'] != r['attempted'] or r['lost']
+                                         or r['duplicates'] or r['stats_drift']
+                                         or r['inconsistent_reads']):
+                raise SystemExit(f"Нарушена целостность: {r}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:5]))
@@ -0,0 +1,35 @@
+"""Бенчмарк пропускной способности сохранения расчётов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_database [количество]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from interface import DatabaseManager
+
+
+def save_throughput(count: int, **options) -> float:
+    """Сохранений в секунду при вызове save_calculation по одной строке"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), **options)
+        start = time.perf_counter()
+        for i in range(count):
+            db.save_calculation("Rectangle", f"ширина={i}, высота=2",
+                                2.0 * i, 1.0, None)
+        # Время включает запись всей очереди в режиме write_behind
+        db.close()
+        elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def main(count: int = 100_000):
+    print(f"save_calculation x{count}: {save_throughput(count):,.0f} строк/с")
+    print(f"save_calculation x{count} (write_behind): "
+          f"{save_throughput(count, write_behind=True):,.0f} строк/с")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
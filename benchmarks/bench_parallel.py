@@ -0,0 +1,45 @@
+"""Бенчмарк масштабирования пакетного расчёта по числу процессов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_parallel [строк] [макс. процессов]
+"""
+import os
+import random
+import sys
+import tempfile
+
+from batch_processing import run_batch
+
+
+def write_input(path: str, count: int):
+    """Синтетический CSV со смесью фигур всех типов"""
+    rnd = random.Random(1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("shape,width,height,a,b,c,base1,base2\n")
+        for i in range(count):
+            kind = i % 3
+            if kind == 0:
+                f.write(f"Rectangle,{rnd.uniform(1, 9)},{rnd.uniform(1, 9)},,,,,\n")
+            elif kind == 1:
+                f.write(f"Triangle,,,{rnd.uniform(3, 4)},{rnd.uniform(3, 4)},{rnd.uniform(3, 4)},,\n")
+            else:
+                f.write(f"Trapezoid,,{rnd.uniform(1, 9)},,,,{rnd.uniform(1, 9)},{rnd.uniform(1, 9)}\n")
+
+
+def main(count: int = 300_000, max_workers: int = os.cpu_count() or 1):
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "shapes.csv")
+        write_input(source, count)
+        print(f"{'процессов':>9} {'строк/с':>12} {'ускорение':>10}")
+        baseline = None
+        workers = 1
+        while workers <= max_workers:
+            summary = run_batch(source, os.path.join(tmp, "out.jsonl"), workers=workers)
+            baseline = baseline or summary['rows_per_second']
+            print(f"{workers:>9} {summary['rows_per_second']:>12,.0f} "
+                  f"{summary['rows_per_second'] / baseline:>9.2f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,113 @@
+"""Нагрузочный тест HTTP-сервиса расчётов (сквозной, через сокеты).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_service [запросов] [соединений] [фигур в запросе]
+
+Сервис запускается отдельным процессом (python interface.py serve) на
+временной БД, клиенты — соединения keep-alive на asyncio. Выводятся
+p50/p99 задержки и запросов в секунду.
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SHAPES = [
+    {"shape": "Rectangle", "width": 3, "height": 4},
+    {"shape": "Triangle", "a": 3, "b": 4, "c": 5},
+    {"shape": "Trapezoid", "base1": 5, "base2": 7, "height": 4},
+]
+
+
+def _body(i: int, batch: int) -> bytes:
+    if batch <= 1:
+        return json.dumps(SHAPES[i % 3]).encode()
+    return json.dumps({"shapes": [SHAPES[(i + j) % 3] for j in range(batch)]}).encode()
+
+
+async def _client(host: str, port: int, requests: List[int], batch: int,
+                  latencies: List[float]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in requests:
+            body = _body(i, batch)
+            start = time.perf_counter()
+            writer.write(b"POST /calculate HTTP/1.1\r\nHost: localhost\r\n"
+                         b"Content-Type: application/json\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(head.decode("latin-1").splitlines()[0])
+    finally:
+        writer.close()
+
+
+async def load_test(host: str, port: int, requests: int = 2000,
+                    concurrency: int = 16, batch: int = 1) -> dict:
+    """Нагрузка на запущенный сервис; сводка задержек и пропускной способности"""
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, list(range(c, requests, concurrency)), batch, latencies)
+        for c in range(concurrency)))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'shapes_per_request': batch,
+        'concurrency': concurrency,
+        'seconds': seconds,
+        'requests_per_second': len(latencies) / seconds,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError("Сервис не запустился")
+
+
+def main(requests: int = 2000, concurrency: int = 16, batch: int = 1, workers: int = 1):
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DB_PATH=os.path.join(tmp, "service.db"))
+        server = subprocess.Popen([sys.executable, "interface.py", "serve", "--port", str(port),
+                                   "--workers", str(workers)], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL)
+        try:
+            _wait_ready(port)
+            result = asyncio.run(load_test("127.0.0.1", port, requests, concurrency, batch))
+        finally:
+            server.terminate()
+            server.wait()
+    print(f"{result['requests']} запросов по {batch} фигур, {concurrency} соединений: "
+          f"{result['requests_per_second']:,.0f} запросов/с, "
+          f"p50 {result['p50_ms']:.2f} мс, p99 {result['p99_ms']:.2f} мс")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:5]))
@@ -0,0 +1,71 @@
+"""Бенчмарк памяти и времени создания объектов фигур.
+
+Текущие классы (__slots__) сравниваются с исходными (benchmarks.legacy_shapes,
+атрибуты в __dict__) на одних и тех же параметрах.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_shapes [количество]
+"""
+import random
+import sys
+import timeit
+import tracemalloc
+
+from geometry_package.rectangle import Rectangle
+from geometry_package.triangle import Triangle
+from geometry_package.trapezoid import Trapezoid
+from benchmarks import legacy_shapes
+
+CASES = {
+    'Rectangle': (Rectangle, lambda: (random.uniform(1, 10), random.uniform(1, 10))),
+    'Triangle': (Triangle, lambda: (3 + random.random(), 4 + random.random(), 5 + random.random())),
+    'Trapezoid': (Trapezoid, lambda: (random.uniform(1, 10), random.uniform(1, 10), random.uniform(1, 10))),
+}
+
+# Исходные классы той же фигуры
+LEGACY = {name: getattr(legacy_shapes, name) for name in CASES}
+
+
+def memory_per_shape(cls, params) -> float:
+    """Байт на объект с вычисленными характеристиками (без учёта самих параметров)"""
+    tracemalloc.start()
+    shapes = [cls(*p) for p in params]
+    for shape in shapes:
+        shape.area, shape.circumscribed_radius, shape.inscribed_radius
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used / len(params)
+
+
+def construction_time(cls, params) -> float:
+    """Микросекунд на создание объекта и расчёт трёх характеристик"""
+    def run():
+        for p in params:
+            shape = cls(*p)
+            shape.area, shape.circumscribed_radius, shape.inscribed_radius
+    return min(timeit.repeat(run, number=1, repeat=5)) / len(params) * 1e6
+
+
+def compare(count: int = 100_000) -> dict:
+    """{фигура: {'before'/'after': (байт на объект, мкс на объект)}}"""
+    random.seed(1)
+    results = {}
+    for name, (cls, make) in CASES.items():
+        params = [make() for _ in range(count)]
+        results[name] = {
+            label: (memory_per_shape(shape_cls, params), construction_time(shape_cls, params))
+            for label, shape_cls in (('before', LEGACY[name]), ('after', cls))
+        }
+    return results
+
+
+def main(count: int = 100_000):
+    print(f"{'Фигура':<10} {'байт до':>9} {'байт после':>11} {'мкс до':>8} {'мкс после':>10}")
+    for name, result in compare(count).items():
+        (memory_before, time_before), (memory_after, time_after) = result['before'], result['after']
+        print(f"{name:<10} {memory_before:>9.1f} {memory_after:>11.1f} "
+              f"{time_before:>8.3f} {time_after:>10.3f}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,58 @@
+"""Бенчмарк времени запуска: импорт модуля по данным python -X importtime.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup [модуль] [предел, мс]
+
+Выводит медиану суммарного времени импорта и самые дорогие зависимости.
+Завершается с кодом 1, если при запуске загрузилась необязательная
+зависимость (python-docx, numpy и т.п.) или превышен предел времени.
+"""
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+# Необязательные зависимости, которые не должны загружаться при запуске
+LAZY_MODULES = ('docx', 'lxml', 'numpy', 'multiprocessing')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str = 'interface') -> Tuple[int, Dict[str, int]]:
+    """
+    Импорт модуля в отдельном интерпретаторе.
+    Возвращает (суммарное время, мкс; {модуль: суммарное время, мкс}).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules[module], modules
+
+
+def main(module: str = 'interface', limit_ms: float = 0.0, repeat: int = 7):
+    runs = [import_profile(module) for _ in range(repeat)]
+    total = statistics.median(t for t, _ in runs) / 1000
+    modules = runs[-1][1]
+    print(f"Импорт {module}: {total:.1f} мс (медиана из {repeat})")
+    for name, cumulative in sorted(modules.items(), key=lambda m: -m[1])[1:11]:
+        print(f"  {name:<40} {cumulative / 1000:>8.1f} мс")
+
+    loaded = [m for m in LAZY_MODULES if m in modules]
+    failed = False
+    if loaded:
+        print(f"Загружены при запуске: {', '.join(loaded)}")
+        failed = True
+    if limit_ms and total > limit_ms:
+        print(f"Превышен предел {limit_ms:.0f} мс")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*args[:1], *(float(a) for a in args[1:2]))
@@ -0,0 +1,134 @@
+"""Фигуры в исходном виде (до __slots__) — база для сравнения в bench_shapes.
+
+Минимальная копия прежних классов: dataclass-основа, атрибуты в __dict__
+экземпляра, кэши характеристик — значения None на уровне класса, которые
+экземпляр перекрывает при первом расчёте. Формулы и проверки те же.
+"""
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Shape:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._area = None
+        cls._circumscribed_radius = None
+        cls._inscribed_radius = None
+
+
+class Rectangle(Shape):
+    def __init__(self, width: float, height: float):
+        self._width = width
+        self._height = height
+        self.validate()
+
+    @property
+    def width(self) -> float:
+        return self._width
+
+    @property
+    def height(self) -> float:
+        return self._height
+
+    @property
+    def area(self) -> float:
+        if self._area is None:
+            self._area = self.width * self.height
+        return self._area
+
+    @property
+    def circumscribed_radius(self) -> float:
+        if self._circumscribed_radius is None:
+            self._circumscribed_radius = math.sqrt(self.width ** 2 + self.height ** 2) / 2
+        return self._circumscribed_radius
+
+    @property
+    def inscribed_radius(self) -> Optional[float]:
+        if math.isclose(self.width, self.height, rel_tol=1e-9):
+            return min(self.width, self.height) / 2
+        return None
+
+    def validate(self) -> bool:
+        if self.width <= 0 or self.height <= 0:
+            raise ValueError("Ширина и высота должны быть положительными")
+        return True
+
+
+class Triangle(Shape):
+    def __init__(self, a: float, b: float, c: float):
+        self._a = a
+        self._b = b
+        self._c = c
+        self.validate()
+
+    @property
+    def sides(self) -> tuple:
+        return (self._a, self._b, self._c)
+
+    @property
+    def area(self) -> float:
+        if self._area is None:
+            s = (self._a + self._b + self._c) / 2
+            self._area = math.sqrt(s * (s - self._a) * (s - self._b) * (s - self._c))
+        return self._area
+
+    @property
+    def circumscribed_radius(self) -> float:
+        if self._circumscribed_radius is None:
+            self._circumscribed_radius = (self._a * self._b * self._c) / (4 * self.area)
+        return self._circumscribed_radius
+
+    @property
+    def inscribed_radius(self) -> float:
+        if self._inscribed_radius is None:
+            self._inscribed_radius = (2 * self.area) / (self._a + self._b + self._c)
+        return self._inscribed_radius
+
+    def validate(self) -> bool:
+        a, b, c = self.sides
+        if a <= 0 or b <= 0 or c <= 0:
+            raise ValueError("Все стороны должны быть положительными")
+        if not (a + b > c and a + c > b and b + c > a):
+            raise ValueError("Треугольник с такими сторонами не существует")
+        return True
+
+
+class Trapezoid(Shape):
+    def __init__(self, base1: float, base2: float, height: float):
+        self._base1 = base1
+        self._base2 = base2
+        self._height = height
+        self.validate()
+
+    @property
+    def area(self) -> float:
+        if self._area is None:
+            self._area = (self._base1 + self._base2) * self._height / 2
+        return self._area
+
+    @property
+    def side_length(self) -> float:
+        base_diff = abs(self._base1 - self._base2) / 2
+        return math.sqrt(base_diff ** 2 + self._height ** 2)
+
+    @property
+    def circumscribed_radius(self) -> Optional[float]:
+        if self._circumscribed_radius is None:
+            a, b = sorted([self._base1, self._base2])
+            c = self.side_length
+            diagonal = math.sqrt(a * b + c ** 2)
+            self._circumscribed_radius = (c * diagonal) / (2 * self._height)
+        return self._circumscribed_radius
+
+    @property
+    def inscribed_radius(self) -> Optional[float]:
+        if math.isclose(self._base1 + self._base2, 2 * self.side_length, rel_tol=1e-9):
+            return self._height / 2
+        return None
+
+    def validate(self) -> bool:
+        if self._base1 <= 0 or self._base2 <= 0 or self._height <= 0:
+            raise ValueError("Все параметры должны быть положительными")
+        return True
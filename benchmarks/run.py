@@ -0,0 +1,221 @@
+"""Набор бенчмарков ядра фигур и работы с БД с сохранением в JSON.
+
+Запуск из корня проекта:
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --sizes 1e3,1e5,1e7 --data-dir bench_data
+    python -m benchmarks.run --output new.json --compare baseline.json
+
+Каждый замер — лучшее из нескольких повторов время одной операции.
+Запросы к БД измеряются на синтетических базах заданных размеров; с
+--data-dir базы сохраняются и переиспользуются между запусками (10^7 строк
+строятся порядка 15 минут). С --compare выводится отношение к базовому
+файлу, а при замедлении больше --threshold код завершения равен 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from database import shape_to_row
+from geometry_package.rectangle import Rectangle
+from geometry_package.triangle import Triangle
+from geometry_package.trapezoid import Trapezoid
+from interface import DatabaseManager
+
+SHAPES = {
+    'Rectangle': (Rectangle, lambda r: (r.uniform(1, 10), r.uniform(1, 10))),
+    'Triangle': (Triangle, lambda r: (3 + r.random(), 4 + r.random(), 5 + r.random())),
+    'Trapezoid': (Trapezoid, lambda r: (r.uniform(1, 10), r.uniform(1, 10), r.uniform(1, 10))),
+}
+
+
+def measure(fn: Callable, repeat: int = 5) -> float:
+    """
+    Секунд на одну операцию: лучшее из repeat повторов, число вызовов в
+    повторе подбирается timeit.autorange (не меньше 0.2 с на повтор).
+    """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def _result(seconds: float, ops: int = 1) -> dict:
+    """Время одной операции; ops — число элементов, обработанных за операцию"""
+    return {'seconds': seconds, 'ops': ops, 'per_item_us': seconds / ops * 1e6}
+
+
+def bench_shapes(count: int, repeat: int) -> Dict[str, dict]:
+    """Создание и расчёт характеристик, сравнение и сортировка"""
+    rnd = random.Random(1)
+    results = {}
+    mixed = []
+    for name, (cls, make) in SHAPES.items():
+        params = [make(rnd) for _ in range(count)]
+
+        def construct():
+            for p in params:
+                shape = cls(*p)
+                shape.area, shape.circumscribed_radius, shape.inscribed_radius
+        results[f'shapes.{name}.construct_metrics'] = _result(
+            measure(construct, repeat=repeat), count)
+        mixed.extend(cls(*p) for p in params)
+
+    rnd.shuffle(mixed)
+    results['shapes.sort'] = _result(measure(lambda: sorted(mixed), repeat=repeat), len(mixed))
+    pairs = list(zip(mixed, mixed[1:] + mixed[:1]))
+    results['shapes.eq'] = _result(
+        measure(lambda: [a == b for a, b in pairs], repeat=repeat), len(pairs))
+    return results
+
+
+def synthetic_database(path: str, rows: int) -> str:
+    """База с rows расчётами всех типов (готовая база переиспользуется)"""
+    with DatabaseManager(path) as db:
+        have = db.get_statistics()['total']
+        if have >= rows:
+            return path
+        rnd = random.Random(rows)
+        types = list(SHAPES.values())
+
+        def generate():
+            for i in range(have, rows):
+                cls, make = types[i % 3]
+                try:
+                    yield shape_to_row(cls(*make(rnd)))
+                except ValueError:
+                    yield shape_to_row(Rectangle(1, 1))
+        db.save_calculations(generate(), chunk_size=50_000)
+    return path
+
+
+def bench_database(path: str, rows: int, repeat: int, saves: int = 1000) -> Dict[str, dict]:
+    """Сохранение, запросы истории и статистика на базе из rows строк"""
+    results = {}
+    prefix = f'db.{rows}'
+    with DatabaseManager(path) as db:
+        conn = db._connect()
+        last_id = conn.execute("SELECT MAX(id) FROM calculations").fetchone()[0]
+
+        def save():
+            for i in range(saves):
+                db.save_calculation("Rectangle", f"ширина={i + 1}, высота=2",
+                                    2.0 * (i + 1), 1.0, None)
+        results[f'{prefix}.save_calculation'] = _result(measure(save, repeat=repeat), saves)
+        # Возвращаем базу к исходному размеру (триггеры поправят статистику)
+        conn.execute("DELETE FROM calculations WHERE id > ?", (last_id,))
+        conn.commit()
+
+        middle = last_id // 2
+        cases = {
+            'history_first_page': lambda: db.get_history_page(page_size=20),
+            'history_deep_page': lambda: db.get_history_page(before_id=middle, page_size=20),
+            'get_all_calculations': lambda: db.get_all_calculations(100),
+            'get_calculations_by_shape': lambda: db.get_calculations_by_shape('Triangle', 50),
+            'find_calculations': lambda: db.find_calculations('Rectangle', limit=100,
+                                                              width=(2.0, 4.0)),
+            'get_statistics': db.get_statistics,
+        }
+        for name, fn in cases.items():
+            results[f'{prefix}.{name}'] = _result(measure(fn, repeat=repeat))
+    return results
+
+
+def run(sizes, shape_count: int = 10_000, repeat: int = 5,
+        data_dir: Optional[str] = None) -> dict:
+    """Все бенчмарки; результат в формате JSON-файла"""
+    results = bench_shapes(shape_count, repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = data_dir or tmp
+        os.makedirs(directory, exist_ok=True)
+        for rows in sizes:
+            start = time.perf_counter()
+            path = synthetic_database(os.path.join(directory, f'synthetic_{rows}.db'), rows)
+            print(f"База {rows} строк готова за {time.perf_counter() - start:.1f} с",
+                  file=sys.stderr)
+            results.update(bench_database(path, rows, repeat))
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """
+    Сравнение с базовыми результатами по общим замерам:
+    [(замер, базовое, текущее, отношение, регрессия)], где регрессия —
+    замедление больше чем в 1 + threshold раз.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base:
+            ratio = result['seconds'] / base['seconds']
+            rows.append((name, base['seconds'], result['seconds'], ratio,
+                         ratio > 1 + threshold))
+    return rows
+
+
+def format_results(data: dict) -> str:
+    lines = [f"{'Замер':<45} {'мкс/оп':>12} {'мкс/элемент':>12}"]
+    for name, r in data['results'].items():
+        lines.append(f"{name:<45} {r['seconds'] * 1e6:>12.2f} {r['per_item_us']:>12.3f}")
+    return "\n".join(lines)
+
+
+def _size(text: str) -> int:
+    return int(float(text))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Бенчмарки фигур и БД")
+    parser.add_argument("--sizes", default="1e3,1e4,1e5",
+                        help="размеры синтетических БД через запятую (до 1e7)")
+    parser.add_argument("--shapes", type=_size, default=10_000, help="фигур в замерах ядра")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--data-dir", help="каталог для переиспользуемых синтетических БД")
+    parser.add_argument("--output", help="файл JSON с результатами")
+    parser.add_argument("--compare", help="базовый файл JSON для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="допустимое замедление относительно базового (доля)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    data = run([_size(s) for s in args.sizes.split(",")], args.shapes, args.repeat,
+               args.data_dir)
+    print(format_results(data))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    if not args.compare:
+        return 0
+    with open(args.compare, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = 0
+    print(f"\n{'Замер':<45} {'было, мкс':>12} {'стало, мкс':>12} {'x':>7}")
+    for name, before, after, ratio, slower in compare(data, baseline, args.threshold):
+        regressions += slower
+        print(f"{name:<45} {before * 1e6:>12.2f} {after * 1e6:>12.2f} {ratio:>7.2f}"
+              f"{'  РЕГРЕССИЯ' if slower else ''}")
+    print(f"\nРегрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
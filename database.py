@@ -1,20 +1,555 @@
+import atexit
+import functools
+import queue
+import random
 import sqlite3
-from typing import List, Tuple, Optional
+import threading
+import time
+import weakref
+from collections.abc import Sequence
+from contextlib import contextmanager
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Tuple, Optional
+import math
 import os
+import re
+
+from geometry_package import Rectangle, Triangle, Trapezoid, instrumentation
+from geometry_package.cache import normalize_key
+
+# Настройки соединения по умолчанию: WAL и synchronous=NORMAL убирают
+# fsync на каждый commit, cache_size задаётся в КиБ (отрицательное значение).
+# busy_timeout (мс) — сколько ждать блокировку другого процесса, прежде чем
+# вернуть SQLITE_BUSY. auto_vacuum действует только для новой БД (до создания
+# таблиц), поэтому идёт до journal_mode: освобождённые страницы возвращаются
+# через PRAGMA incremental_vacuum
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,
+}
+
+# Повтор записи при SQLITE_BUSY: пауза удваивается от RETRY_DELAY до
+# RETRY_MAX_DELAY секунд со случайным разбросом, чтобы процессы не повторяли
+# попытки одновременно
+RETRY_DELAY = 0.01
+RETRY_MAX_DELAY = 1.0
+
+# Формат строки parameters для каждого типа фигуры
+PARAMETER_FORMATS = {
+    'Rectangle': "ширина={width}, высота={height}",
+    'Triangle': "{a},{b},{c}",
+    'Trapezoid': "{base1},{base2}, h={height}",
+}
+
+# Классы фигур по значению столбца shape_type
+SHAPE_CLASSES = {cls.__name__: cls for cls in (Rectangle, Triangle, Trapezoid)}
+
+# Числовые столбцы параметров: param1..param3 в порядке cls.FIELDS
+PARAMETER_COLUMNS = ('param1', 'param2', 'param3')
+
+INSERT_CALCULATION = '''
+    INSERT INTO calculations
+    (shape_type, parameters, area, circumscribed_radius, inscribed_radius,
+     param1, param2, param3, params_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+def shape_to_row(shape) -> tuple:
+    """Строка таблицы calculations для объекта фигуры"""
+    shape_type = shape.shape_type
+    if shape_type not in PARAMETER_FORMATS:
+        raise ValueError(f"Неизвестный тип фигуры: {shape_type}")
+    fields = SHAPE_CLASSES[shape_type].FIELDS
+    parameters = PARAMETER_FORMATS[shape_type].format(**dict(zip(fields, shape.parameters)))
+    return (shape_type, parameters, shape.area,
+            shape.circumscribed_radius, shape.inscribed_radius)
+
+
+def parse_parameters(shape_type: str, parameters: str) -> Optional[tuple]:
+    """
+    Числовые параметры из строки parameters (форматы PARAMETER_FORMATS).
+    Возвращает None, если строку не удалось разобрать.
+    """
+    cls = SHAPE_CLASSES.get(shape_type)
+    if cls is None:
+        return None
+    values = _NUMBER.findall(parameters)
+    if len(values) != len(cls.FIELDS):
+        return None
+    return tuple(float(v) for v in values)
+
+
+def _parameter_values(params: Optional[tuple]) -> tuple:
+    """Значения для столбцов param1..param3 (недостающие — NULL)"""
+    params = params or ()
+    return tuple(params) + (None,) * (len(PARAMETER_COLUMNS) - len(params))
+
+
+def params_key(shape_type: str, params: Optional[tuple]) -> Optional[str]:
+    """
+    Ключ нормализованных параметров для поиска уже посчитанной фигуры,
+    например 'Triangle:3.0,4.0,5.0' (порядок сторон не важен).
+    """
+    if params is None:
+        return None
+    shape_type, *values = normalize_key(shape_type, params)
+    return f"{shape_type}:{','.join(repr(v) for v in values)}"
+
+
+def history_filter(shape_type: Optional[str] = None, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None) -> Tuple[str, list]:
+    """
+    Условие WHERE (или пустая строка) и его параметры для выборки истории.
+    date_from/date_to — даты 'ГГГГ-ММ-ДД', обе включительно.
+    """
+    conditions, args = [], []
+    if date_from:
+        conditions.append("timestamp >= date(?)")
+        args.append(date_from)
+    if date_to:
+        conditions.append("timestamp < date(?, '+1 day')")
+        args.append(date_to)
+    if shape_type:
+        conditions.append("shape_type = ?")
+        args.append(shape_type)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), args
+
+
+def _migration_history_indexes(conn):
+    """Индексы для выборок истории, упорядоченных по времени"""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_calculations_timestamp '
+                 'ON calculations (timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_calculations_shape_timestamp '
+                 'ON calculations (shape_type, timestamp)')
+
+
+def _migration_parameter_columns(conn):
+    """Числовые столбцы параметров с заполнением из строки parameters"""
+    for column in PARAMETER_COLUMNS:
+        conn.execute(f'ALTER TABLE calculations ADD COLUMN {column} REAL')
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, shape_type, parameters FROM calculations '
+            'WHERE id > ? ORDER BY id LIMIT 10000', (last_id,)).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            'UPDATE calculations SET param1 = ?, param2 = ?, param3 = ? WHERE id = ?',
+            (_parameter_values(parse_parameters(t, p)) + (id_,) for id_, t, p in rows))
+        last_id = rows[-1][0]
+
+    # Индексы создаются после заполнения — так быстрее
+    for column in PARAMETER_COLUMNS:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_calculations_shape_{column} '
+                     f'ON calculations (shape_type, {column})')
+
+
+# Сводная статистика по типам фигур, которую поддерживают триггеры
+STATS_INSERT_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS calculations_stats_insert
+    AFTER INSERT ON calculations
+    BEGIN
+        INSERT INTO calculation_stats
+            (shape_type, count, sum_area, min_area, max_area, last_timestamp)
+        VALUES (NEW.shape_type, 1, NEW.area, NEW.area, NEW.area, NEW.timestamp)
+        ON CONFLICT (shape_type) DO UPDATE SET
+            count = count + 1,
+            sum_area = sum_area + excluded.sum_area,
+            min_area = MIN(min_area, excluded.min_area),
+            max_area = MAX(max_area, excluded.max_area),
+            last_timestamp = MAX(last_timestamp, excluded.last_timestamp);
+    END
+'''
+
+# Минимум, максимум и время пересчитываются по индексам только если
+# удалена строка, на которой они достигались
+_STATS_REMOVE_OLD = '''
+        UPDATE calculation_stats SET
+            count = count - 1,
+            sum_area = sum_area - OLD.area,
+            min_area = CASE WHEN OLD.area <= min_area THEN
+                (SELECT MIN(area) FROM calculations WHERE shape_type = OLD.shape_type)
+                ELSE min_area END,
+            max_area = CASE WHEN OLD.area >= max_area THEN
+                (SELECT MAX(area) FROM calculations WHERE shape_type = OLD.shape_type)
+                ELSE max_area END,
+            last_timestamp = CASE WHEN OLD.timestamp >= last_timestamp THEN
+                (SELECT MAX(timestamp) FROM calculations WHERE shape_type = OLD.shape_type)
+                ELSE last_timestamp END
+        WHERE shape_type = OLD.shape_type;
+        DELETE FROM calculation_stats WHERE shape_type = OLD.shape_type AND count <= 0;
+'''
+
+STATS_DELETE_TRIGGER = f'''
+    CREATE TRIGGER IF NOT EXISTS calculations_stats_delete
+    AFTER DELETE ON calculations
+    BEGIN
+        {_STATS_REMOVE_OLD}
+    END
+'''
+
+STATS_UPDATE_TRIGGER = f'''
+    CREATE TRIGGER IF NOT EXISTS calculations_stats_update
+    AFTER UPDATE OF shape_type, area, timestamp ON calculations
+    BEGIN
+        {_STATS_REMOVE_OLD}
+        INSERT INTO calculation_stats
+            (shape_type, count, sum_area, min_area, max_area, last_timestamp)
+        VALUES (NEW.shape_type, 1, NEW.area, NEW.area, NEW.area, NEW.timestamp)
+        ON CONFLICT (shape_type) DO UPDATE SET
+            count = count + 1,
+            sum_area = sum_area + excluded.sum_area,
+            min_area = MIN(min_area, excluded.min_area),
+            max_area = MAX(max_area, excluded.max_area),
+            last_timestamp = MAX(last_timestamp, excluded.last_timestamp);
+    END
+'''
+
+# Полный пересчёт сводной статистики по таблице calculations
+STATS_FROM_SCRATCH = '''
+    SELECT shape_type, COUNT(*), SUM(area), MIN(area), MAX(area), MAX(timestamp)
+    FROM calculations
+    GROUP BY shape_type
+'''
+
+
+def _migration_statistics_table(conn):
+    """Таблица сводной статистики, триггеры и её начальное заполнение"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS calculation_stats (
+            shape_type TEXT PRIMARY KEY,
+            count INTEGER NOT NULL,
+            sum_area REAL NOT NULL,
+            min_area REAL,
+            max_area REAL,
+            last_timestamp DATETIME
+        )
+    ''')
+    # Нужен триггерам для пересчёта минимума и максимума площади
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_calculations_shape_area '
+                 'ON calculations (shape_type, area)')
+    conn.execute(f'INSERT INTO calculation_stats {STATS_FROM_SCRATCH}')
+    for trigger in (STATS_INSERT_TRIGGER, STATS_DELETE_TRIGGER, STATS_UPDATE_TRIGGER):
+        conn.execute(trigger)
+
+
+# Повторные запросы удаляются вместе с расчетом
+REQUESTS_CLEANUP_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS calculation_requests_cleanup
+    AFTER DELETE ON calculations
+    BEGIN
+        DELETE FROM calculation_requests WHERE calculation_id = OLD.id;
+    END
+'''
+
+
+def _migration_params_key(conn):
+    """Ключ нормализованных параметров и таблица повторных запросов"""
+    conn.execute('ALTER TABLE calculations ADD COLUMN params_key TEXT')
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, shape_type, param1, param2, param3 FROM calculations '
+            'WHERE id > ? ORDER BY id LIMIT 10000', (last_id,)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for id_, shape_type, *values in rows:
+            cls = SHAPE_CLASSES.get(shape_type)
+            params = tuple(values[:len(cls.FIELDS)]) if cls else None
+            if params is not None and None in params:
+                params = None
+            updates.append((params_key(shape_type, params), id_))
+        conn.executemany('UPDATE calculations SET params_key = ? WHERE id = ?', updates)
+        last_id = rows[-1][0]
+
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_calculations_params_key '
+                 'ON calculations (params_key)')
+    # Время повторных запросов фигуры, уже сохранённой в calculations
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS calculation_requests (
+            calculation_id INTEGER NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_calculation_requests_id '
+                 'ON calculation_requests (calculation_id)')
+    conn.execute(REQUESTS_CLEANUP_TRIGGER)
+
+
+# Миграции схемы; номер версии хранится в PRAGMA user_version.
+# Новые миграции добавляются только в конец списка.
+MIGRATIONS = [
+    _migration_history_indexes,
+    _migration_parameter_columns,
+    _migration_statistics_table,
+    _migration_params_key,
+]
+
+# Служебные сообщения очереди отложенной записи
+_FLUSH = object()
+_STOP = object()
+
+
+def is_busy_error(error: Exception) -> bool:
+    """SQLITE_BUSY/SQLITE_LOCKED: БД занята другим соединением"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def _retry_busy(method):
+    """Повтор метода записи при SQLITE_BUSY (транзакция метода уже откачена)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._run_with_retry(method, self, *args, **kwargs)
+    return wrapper
+
+
+class IdRanges(Sequence):
+    """
+    id строк, вставленных save_calculations: по непрерывному диапазону на
+    порцию (соседние диапазоны сливаются). Между порциями свои строки могут
+    записать другие процессы, поэтому общий диапазон не обязательно сплошной.
+    """
+
+    def __init__(self):
+        self.ranges: List[range] = []
+
+    def add(self, first_id: int, last_id: int):
+        if self.ranges and self.ranges[-1].stop == first_id:
+            self.ranges[-1] = range(self.ranges[-1].start, last_id + 1)
+        else:
+            self.ranges.append(range(first_id, last_id + 1))
+
+    def __len__(self) -> int:
+        return sum(map(len, self.ranges))
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(self.ranges)
+
+    def __contains__(self, value) -> bool:
+        return any(value in r for r in self.ranges)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        for r in self.ranges:
+            if 0 <= index < len(r):
+                return r[index]
+            index -= len(r)
+        raise IndexError("Индекс вне диапазона")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"IdRanges({self.ranges!r})"
+
+
+class _ThreadConnection:
+    """Соединение потока: закрывается, когда поток завершается (данные local удаляются)"""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __del__(self):
+        self.conn.close()
+
+
+def _as_row(item) -> tuple:
+    """Объект фигуры или готовый кортеж -> кортеж для INSERT_CALCULATION"""
+    if isinstance(item, tuple):
+        row, params = item, parse_parameters(item[0], item[1])
+    else:
+        row, params = shape_to_row(item), item.parameters
+    return row + _parameter_values(params) + (params_key(row[0], params),)
+
 
 class DatabaseManager:
     """Менеджер для работы с существующей базой данных SQLite"""
 
-    class DatabaseManager:
-        def __init__(self, db_name: str = None):
-            # Берём путь из ENV, иначе используем стандартный
-            self.db_name = db_name or os.getenv("DB_PATH", "geometry_calculations.db")
-            self._validate_database()
+    # Столбец времени в выборках истории
+    TIME_COLUMN = "datetime(timestamp, 'localtime')"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Методы, переопределённые в наследниках, тоже попадают в метрики
+        instrumentation.instrument_methods(cls, 'db')
+
+    def __init__(self, db_name: str = None, pragmas: Optional[dict] = None,
+                 write_behind: bool = False, flush_size: int = 1000,
+                 flush_interval: float = 0.5, busy_retries: int = 8):
+        """
+        write_behind включает отложенную запись: save_calculation ставит строку
+        в очередь, а отдельный поток записывает очередь группами — не больше
+        flush_size строк и не позже flush_interval секунд после первой строки.
+
+        Несколько процессов могут работать с одной БД: в WAL читатели не
+        блокируют писателя, занятая БД ожидается busy_timeout миллисекунд, а
+        запись, всё же получившая SQLITE_BUSY, повторяется до busy_retries раз
+        с нарастающей паузой (счётчик повторов — busy_retry_count).
+        """
+        # Берём путь из ENV, иначе используем стандартный
+        self.db_name = db_name or os.getenv("DB_PATH", "geometry_calculations.db")
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.busy_retries = busy_retries
+        self.busy_retry_count = 0
+        # По соединению на поток; соединение завершившегося потока закрывается
+        # вместе с его данными threading.local, close() закрывает остальные
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._init_schema()
+
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue = None
+        self._writer = None
+        self._writer_error = None
+        if write_behind:
+            self._start_writer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение текущего потока (создаётся при первом обращении)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False нужен только для закрытия из close()
+            conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            try:
+                self._apply_pragmas(conn)
+            except BaseException:
+                conn.close()
+                raise
+            holder = _ThreadConnection(conn)
+            self._local.conn = conn
+            self._local.holder = holder
+            with self._lock:
+                self._connections.add(holder)
+        return conn
+
+    @_retry_busy
+    def _apply_pragmas(self, conn: sqlite3.Connection):
+        # Переход в WAL требует монопольной блокировки — повторяется при SQLITE_BUSY
+        for name, value in self.pragmas.items():
+            # auto_vacuum меняется только у пустой БД, а у существующей лишь
+            # занимает блокировку записи при каждом подключении
+            if name == 'auto_vacuum' and conn.execute('PRAGMA page_count').fetchone()[0]:
+                continue
+            conn.execute(f"PRAGMA {name}={value}")
+
+    def _run_with_retry(self, operation, *args, **kwargs):
+        """
+        Вызов операции записи с повтором при SQLITE_BUSY. Операция должна
+        сама откатывать свою транзакцию при ошибке (например, через with conn).
+        """
+        if getattr(self._local, 'snapshot', False):
+            # commit/rollback записи завершил бы транзакцию снимка
+            raise RuntimeError("Запись внутри snapshot() недопустима")
+        attempt = 0
+        while True:
+            try:
+                return operation(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if attempt >= self.busy_retries or not is_busy_error(e):
+                    raise
+            self.busy_retry_count += 1
+            delay = min(RETRY_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Согласованное чтение: все запросы менеджера в этом потоке внутри блока
+        видят один снимок БД на момент входа (транзакция чтения WAL), записи
+        других процессов после входа не видны. Методы записи внутри блока
+        вызывают RuntimeError. Вложенный блок использует снимок внешнего.
+        """
+        conn = self._connect()
+        if getattr(self._local, 'snapshot', False):
+            yield conn
+            return
+        conn.execute('BEGIN')
+        self._local.snapshot = True
+        try:
+            # Снимок фиксируется первым чтением
+            conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+            yield conn
+        finally:
+            self._local.snapshot = False
+            conn.rollback()
+
+    def close(self):
+        """Запись отложенных строк и закрытие всех соединений менеджера"""
+        try:
+            self._stop_writer()
+        finally:
+            self._close_connections()
+
+    def _close_connections(self):
+        with self._lock:
+            holders, self._connections = list(self._connections), weakref.WeakSet()
+            self._local = threading.local()
+        for holder in holders:
+            holder.conn.close()
+
+    def _init_schema(self):
+        """Подготовка схемы при создании менеджера"""
+        self._validate_database()
+        self._migrate()
+
+    @_retry_busy
+    def _migrate(self):
+        """Применение недостающих миграций схемы"""
+        conn = self._connect()
+        # Актуальная схема проверяется без блокировки записи
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+            return
+        while True:
+            # IMMEDIATE: параллельные процессы не применят миграцию дважды
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                if version >= len(MIGRATIONS):
+                    conn.commit()
+                    return
+                MIGRATIONS[version](conn)
+                conn.execute(f'PRAGMA user_version = {version + 1}')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
 
     def _validate_database(self):
         """Проверка существования и структуры базы данных"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 # Проверяем существование таблицы calculations
                 cursor.execute("""
@@ -34,72 +569,415 @@ class DatabaseManager:
     def save_calculation(self, shape_type: str, parameters: str,
                          area: float, circumscribed_radius: Optional[float],
                          inscribed_radius: Optional[float]) -> int:
-        """Сохранение расчета в базу данных"""
-        with sqlite3.connect(self.db_name) as conn:
+        """
+        Сохранение расчета в базу данных.
+        В режиме отложенной записи строка ставится в очередь и возвращается None.
+        """
+        row = _as_row((shape_type, parameters, area, circumscribed_radius, inscribed_radius))
+        if self._queue is not None:
+            self._raise_writer_error()
+            self._queue.put(row)
+            return None
+        return self._insert_row(row)
+
+    @_retry_busy
+    def _insert_row(self, row: tuple) -> int:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO calculations 
-                (shape_type, parameters, area, circumscribed_radius, inscribed_radius)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (shape_type, parameters, area, circumscribed_radius, inscribed_radius))
+            cursor.execute(INSERT_CALCULATION, row)
             conn.commit()
             return cursor.lastrowid
 
+    def save_shape(self, shape) -> int:
+        """Сохранение расчета по объекту фигуры"""
+        return self.save_calculation(*shape_to_row(shape))
+
+    def save_calculations(self, rows: Iterable, chunk_size: int = 10_000) -> IdRanges:
+        """
+        Пакетное сохранение расчетов.
+        Принимает любой итерируемый объект (в том числе генератор) из фигур
+        или кортежей (shape_type, parameters, area, circumscribed_radius,
+        inscribed_radius). Строки пишутся порциями по chunk_size, одна
+        транзакция на порцию. Возвращает id вставленных строк (IdRanges).
+        """
+        if chunk_size <= 0:
+            raise ValueError("Размер порции должен быть положительным")
+
+        rows = map(_as_row, rows)
+        ids = IdRanges()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            # Внутри транзакции порции id идут подряд
+            last_id = self._insert_chunk(chunk)
+            ids.add(last_id - len(chunk) + 1, last_id)
+        return ids
+
+    @_retry_busy
+    def _insert_chunk(self, chunk: List[tuple]) -> int:
+        """Вставка порции строк одной транзакцией; возвращает последний id"""
+        with self._connect() as conn:
+            conn.executemany(INSERT_CALCULATION, chunk)
+            return conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+    # ---------------- Отложенная запись -----------------
+    def _start_writer(self):
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_behind_loop,
+                                        name="calculations-writer", daemon=True)
+        self._writer.start()
+        # Незаписанные строки не должны теряться при обычном завершении
+        atexit.register(self.close)
+
+    def _stop_writer(self):
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer = None
+        self._queue = None
+        atexit.unregister(self.close)
+        self._raise_writer_error()
+
+    def flush(self):
+        """Немедленная запись всех строк из очереди отложенной записи"""
+        if self._queue is None:
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+        self._raise_writer_error()
+
+    def _raise_writer_error(self):
+        error, self._writer_error = self._writer_error, None
+        if error is not None:
+            raise ConnectionError(f"Ошибка отложенной записи в {self.db_name}: {error}")
+
+    def _write_behind_loop(self):
+        """Поток записи: собирает строки в группы и пишет их одной транзакцией"""
+        pending = self._queue
+        running = True
+        while running:
+            batch = []
+            item = pending.get()
+            received = 1
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    running = False
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+                if len(batch) >= self.flush_size:
+                    break
+                try:
+                    item = pending.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                received += 1
+
+            try:
+                if batch:
+                    self._insert_chunk(batch)
+            except sqlite3.Error as e:
+                self._writer_error = e
+            finally:
+                for _ in range(received):
+                    pending.task_done()
+
+    # ---------------- Повторно используемые результаты -----------------
+    def lookup_calculation(self, shape_type: str, params) -> Optional[Tuple]:
+        """
+        Уже сохранённый расчет фигуры с теми же нормализованными параметрами:
+        (id, area, circumscribed_radius, inscribed_radius) или None.
+        """
+        conn = self._connect()
+        return conn.execute('''
+            SELECT id, area, circumscribed_radius, inscribed_radius
+            FROM calculations WHERE params_key = ?
+            ORDER BY id LIMIT 1
+        ''', (params_key(shape_type, tuple(params)),)).fetchone()
+
+    @_retry_busy
+    def save_calculation_unique(self, shape_type: str, parameters: str,
+                                area: float, circumscribed_radius: Optional[float],
+                                inscribed_radius: Optional[float],
+                                keep_timestamps: bool = True) -> Tuple[int, bool]:
+        """
+        Сохранение без дубликатов: если такая фигура уже есть, новая строка
+        не добавляется. keep_timestamps=True записывает время повторного
+        запроса в calculation_requests. Возвращает (id, создана ли строка).
+        """
+        row = _as_row((shape_type, parameters, area, circumscribed_radius, inscribed_radius))
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            existing = None
+            if row[-1] is not None:
+                existing = conn.execute(
+                    'SELECT id FROM calculations WHERE params_key = ? ORDER BY id LIMIT 1',
+                    (row[-1],)).fetchone()
+            if existing is None:
+                return conn.execute(INSERT_CALCULATION, row).lastrowid, True
+            if keep_timestamps:
+                conn.execute('INSERT INTO calculation_requests (calculation_id) VALUES (?)',
+                             existing)
+            return existing[0], False
+
+    def save_shape_unique(self, shape, keep_timestamps: bool = True) -> Tuple[int, bool]:
+        """save_calculation_unique по объекту фигуры"""
+        return self.save_calculation_unique(*shape_to_row(shape), keep_timestamps=keep_timestamps)
+
+    @_retry_busy
+    def compact_duplicates(self, keep_timestamps: bool = True) -> int:
+        """
+        Удаление повторов одной и той же фигуры: остаётся самая ранняя строка,
+        время остальных при keep_timestamps=True переносится в calculation_requests.
+        Возвращает количество удалённых строк.
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('''
+                CREATE TEMP TABLE duplicate_calculations AS
+                SELECT c.id, c.timestamp, k.keep_id
+                FROM calculations c
+                JOIN (SELECT params_key, MIN(id) AS keep_id FROM calculations
+                      WHERE params_key IS NOT NULL
+                      GROUP BY params_key HAVING COUNT(*) > 1) k
+                  ON c.params_key = k.params_key
+                WHERE c.id != k.keep_id
+            ''')
+            try:
+                if keep_timestamps:
+                    conn.execute('''
+                        INSERT INTO calculation_requests (calculation_id, timestamp)
+                        SELECT keep_id, timestamp FROM duplicate_calculations
+                    ''')
+                conn.execute('''
+                    UPDATE calculation_requests SET calculation_id = (
+                        SELECT keep_id FROM duplicate_calculations d
+                        WHERE d.id = calculation_requests.calculation_id)
+                    WHERE calculation_id IN (SELECT id FROM duplicate_calculations)
+                ''')
+                removed = conn.execute('''
+                    DELETE FROM calculations
+                    WHERE id IN (SELECT id FROM duplicate_calculations)
+                ''').rowcount
+            finally:
+                conn.execute('DROP TABLE temp.duplicate_calculations')
+            return removed
+
     def get_all_calculations(self, limit: int = 100) -> List[Tuple]:
         """Получение всех расчетов с ограничением по количеству"""
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, shape_type, parameters, area, 
-                       circumscribed_radius, inscribed_radius, 
-                       datetime(timestamp, 'localtime')
-                FROM calculations 
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (limit,))
-            return cursor.fetchall()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, shape_type, parameters, area, 
+                   circumscribed_radius, inscribed_radius, 
+                   datetime(timestamp, 'localtime')
+            FROM calculations 
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (limit,))
+        return cursor.fetchall()
 
     def get_calculations_by_shape(self, shape_type: str, limit: int = 50) -> List[Tuple]:
         """Получение расчетов по типу фигуры"""
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM calculations 
-                WHERE shape_type = ? 
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (shape_type, limit))
-            return cursor.fetchall()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, shape_type, parameters, area,
+                   circumscribed_radius, inscribed_radius, timestamp
+            FROM calculations 
+            WHERE shape_type = ? 
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (shape_type, limit))
+        return cursor.fetchall()
+
+    def find_calculations(self, shape_type: str, limit: int = 100,
+                          **ranges: Tuple[Optional[float], Optional[float]]) -> List[Tuple]:
+        """
+        Поиск расчетов по диапазонам параметров через индексы, например
+        find_calculations("Triangle", a=(3, 5)) — треугольники со стороной a от 3 до 5.
+        Границы включительные; None — открытая граница.
+        """
+        cls = SHAPE_CLASSES.get(shape_type)
+        if cls is None:
+            raise ValueError(f"Неизвестный тип фигуры: {shape_type}")
+
+        conditions = ['shape_type = ?']
+        args = [shape_type]
+        for name, (low, high) in ranges.items():
+            if name not in cls.FIELDS:
+                raise ValueError(f"У фигуры {shape_type} нет параметра {name}")
+            column = PARAMETER_COLUMNS[cls.FIELDS.index(name)]
+            if low is not None:
+                conditions.append(f'{column} >= ?')
+                args.append(low)
+            if high is not None:
+                conditions.append(f'{column} <= ?')
+                args.append(high)
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, shape_type, parameters, area,
+                   circumscribed_radius, inscribed_radius, {self.TIME_COLUMN}
+            FROM calculations
+            WHERE {' AND '.join(conditions)}
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (*args, limit))
+        return cursor.fetchall()
+
+    def get_history_page(self, before_id: Optional[int] = None,
+                         after_id: Optional[int] = None,
+                         page_size: int = 20) -> List[Tuple]:
+        """
+        Страница истории от новых расчетов к старым (keyset-пагинация).
+        before_id — следующая, более старая страница (id < before_id);
+        after_id — предыдущая, более новая страница (id > after_id).
+        """
+        columns = ('id, shape_type, parameters, area, circumscribed_radius, '
+                   f'inscribed_radius, {self.TIME_COLUMN}')
+        conn = self._connect()
+        cursor = conn.cursor()
+        if after_id is not None:
+            cursor.execute(f'''
+                SELECT {columns} FROM calculations
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (after_id, page_size))
+            return cursor.fetchall()[::-1]
+        if before_id is not None:
+            cursor.execute(f'''
+                SELECT {columns} FROM calculations
+                WHERE id < ? ORDER BY id DESC LIMIT ?
+            ''', (before_id, page_size))
+        else:
+            cursor.execute(f'''
+                SELECT {columns} FROM calculations
+                ORDER BY id DESC LIMIT ?
+            ''', (page_size,))
+        return cursor.fetchall()
+
+    def iter_history(self, after_id: Optional[int] = None,
+                     page_size: int = 1000) -> Iterator[Tuple]:
+        """
+        Проход по всей истории от старых расчетов к новым.
+        Каждая страница — отдельный запрос по первичному ключу, без OFFSET.
+        """
+        last_id = 0 if after_id is None else after_id
+        while True:
+            page = self.get_history_page(after_id=last_id, page_size=page_size)
+            if not page:
+                return
+            yield from reversed(page)
+            last_id = page[0][0]
+
+    def count_calculations(self, shape_type: Optional[str] = None,
+                           date_from: Optional[str] = None,
+                           date_to: Optional[str] = None) -> int:
+        """Количество расчетов; без интервала дат — из calculation_stats, без сканирования"""
+        conn = self._connect()
+        if not (date_from or date_to):
+            if shape_type:
+                row = conn.execute("SELECT count FROM calculation_stats WHERE shape_type = ?",
+                                   (shape_type,)).fetchone()
+            else:
+                row = conn.execute("SELECT SUM(count) FROM calculation_stats").fetchone()
+            return (row and row[0]) or 0
+        where, args = history_filter(shape_type, date_from, date_to)
+        return conn.execute(f"SELECT COUNT(*) FROM calculations {where}", args).fetchone()[0]
+
+    def iter_calculations(self, shape_type: Optional[str] = None,
+                          date_from: Optional[str] = None, date_to: Optional[str] = None,
+                          batch_size: int = 10_000) -> Iterator[List[Tuple]]:
+        """
+        Все подходящие расчеты от старых к новым порциями по batch_size строк
+        (курсор читается через fetchmany, память не зависит от размера таблицы).
+        Время — как хранится в БД (UTC).
+        """
+        where, args = history_filter(shape_type, date_from, date_to)
+        cursor = self._connect().execute(f'''
+            SELECT id, shape_type, parameters, area,
+                   circumscribed_radius, inscribed_radius, timestamp
+            FROM calculations {where}
+            ORDER BY id
+        ''', args)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
 
     def get_statistics(self) -> dict:
-        """Получение статистики по расчетам"""
-        with sqlite3.connect(self.db_name) as conn:
+        """Получение статистики по расчетам (из сводной таблицы calculation_stats)"""
+        with self.snapshot() as conn:
             cursor = conn.cursor()
 
-            cursor.execute('SELECT COUNT(*) FROM calculations')
-            total = cursor.fetchone()[0]
-
             cursor.execute('''
-                SELECT shape_type, COUNT(*) as count, 
-                       AVG(area) as avg_area,
-                       MIN(area) as min_area,
-                       MAX(area) as max_area
-                FROM calculations 
-                GROUP BY shape_type
+                SELECT shape_type, count,
+                       sum_area / count as avg_area,
+                       min_area,
+                       max_area
+                FROM calculation_stats
+                ORDER BY shape_type
             ''')
 
             by_shape = cursor.fetchall()
 
             # Дополнительная статистика
-            cursor.execute('SELECT MAX(timestamp) FROM calculations')
+            cursor.execute('SELECT MAX(last_timestamp) FROM calculation_stats')
             last_calculation = cursor.fetchone()[0]
 
             return {
-                'total': total,
+                'total': sum(row[1] for row in by_shape),
                 'by_shape': by_shape,
                 'last_calculation': last_calculation
             }
 
+    def verify_statistics(self, repair: bool = False) -> List[dict]:
+        """
+        Сверка сводной статистики с полным пересчётом по таблице calculations.
+        Возвращает список расхождений (пустой, если их нет);
+        при repair=True сводная таблица пересобирается.
+        """
+        fields = ('count', 'sum_area', 'min_area', 'max_area', 'last_timestamp')
+        # Оба чтения видят один снимок (внутри snapshot() — снимок вызывающего)
+        with self.snapshot() as conn:
+            expected = {row[0]: row[1:] for row in conn.execute(STATS_FROM_SCRATCH)}
+            actual = {row[0]: row[1:] for row in conn.execute(
+                f'SELECT shape_type, {", ".join(fields)} FROM calculation_stats')}
+
+        drift = []
+        for shape_type in sorted(expected.keys() | actual.keys()):
+            exp = expected.get(shape_type, (None,) * len(fields))
+            act = actual.get(shape_type, (None,) * len(fields))
+            for field, e, a in zip(fields, exp, act):
+                same = (e == a if not isinstance(e, float) or not isinstance(a, float)
+                        else math.isclose(e, a, rel_tol=1e-9, abs_tol=1e-9))
+                if not same:
+                    drift.append({'shape_type': shape_type, 'field': field,
+                                  'expected': e, 'actual': a})
+
+        if drift and repair:
+            self._rebuild_statistics()
+        return drift
+
+    @_retry_busy
+    def _rebuild_statistics(self):
+        """Пересборка calculation_stats по таблице calculations"""
+        conn = self._connect()
+        with conn:
+            # IMMEDIATE: пересчёт и замена идут под блокировкой записи
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM calculation_stats')
+            conn.execute(f'INSERT INTO calculation_stats {STATS_FROM_SCRATCH}')
+
+    @_retry_busy
     def clear_history(self, confirm: bool = False) -> int:
         """
         Очистка истории расчетов.
@@ -108,16 +986,27 @@ class DatabaseManager:
         if not confirm:
             return 0
 
-        with sqlite3.connect(self.db_name) as conn:
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
             cursor = conn.cursor()
             cursor.execute('SELECT COUNT(*) FROM calculations')
             count = cursor.fetchone()[0]
 
+            # Без построчных триггеров DELETE выполняется как быстрая очистка
+            cursor.execute('DROP TRIGGER calculations_stats_delete')
+            cursor.execute('DROP TRIGGER calculation_requests_cleanup')
             cursor.execute('DELETE FROM calculations')
-            conn.commit()
+            cursor.execute('DELETE FROM calculation_stats')
+            cursor.execute('DELETE FROM calculation_requests')
+            cursor.execute(STATS_DELETE_TRIGGER)
+            cursor.execute(REQUESTS_CLEANUP_TRIGGER)
 
             return count
 
     def get_recent_calculations(self, count: int = 5) -> List[Tuple]:
         """Получение последних расчетов"""
-        return self.get_all_calculations(limit=count)
\ No newline at end of file
+        return self.get_all_calculations(limit=count)
+
+
+instrumentation.instrument_methods(DatabaseManager, 'db')
@@ -0,0 +1,245 @@
+"""Двоичный формат наборов фигур с чтением через memory map.
+
+Параметры и характеристики фигур хранятся как float64 без разбора текста:
+
+    заголовок (64 байта): MAGIC, версия, число блоков, число строк
+    блок: тип фигуры, число параметров, число строк (16 байт), затем
+          столбцы float64 подряд: параметры по FIELDS, area,
+          circumscribed_radius, inscribed_radius (NaN — не существует)
+
+Запись потоковая: строки копятся по типам и сбрасываются блоками по
+block_rows, заголовок дописывается при закрытии. Чтение отображает файл в
+память (numpy.memmap): открытие читает только заголовки блоков, столбцы
+блока — представления без копирования, поэтому файл любого размера
+открывается сразу и обрабатывается по блокам.
+
+Порядок байтов — little-endian. Требует numpy для чтения.
+"""
+import math
+import struct
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from database import DatabaseManager, PARAMETER_FORMATS, SHAPE_CLASSES
+from geometry_package import batch
+
+MAGIC = b"GEOSHAPE"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ40x")
+BLOCK_HEADER = struct.Struct("<iiQ")
+METRICS = ('area', 'circumscribed_radius', 'inscribed_radius')
+
+SHAPE_TYPES = tuple(SHAPE_CLASSES)
+
+
+def _columns(shape_type: str) -> tuple:
+    return SHAPE_CLASSES[shape_type].FIELDS + METRICS
+
+
+class DatasetWriter:
+    """Потоковая запись набора фигур"""
+
+    def __init__(self, path: str, block_rows: int = 65_536):
+        if block_rows <= 0:
+            raise ValueError("Размер блока должен быть положительным")
+        self.path = path
+        self.block_rows = block_rows
+        self.blocks = 0
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        # Накопленные строки: {тип: [array('d') на каждый столбец]}
+        self._buffers: Dict[str, List[array]] = {}
+
+    def write(self, shape_type: str, params, area: float,
+              circumscribed_radius: Optional[float], inscribed_radius: Optional[float]):
+        """Одна строка; None в характеристиках записывается как NaN"""
+        if shape_type not in SHAPE_CLASSES:
+            raise ValueError(f"Неизвестный тип фигуры: {shape_type}")
+        columns = self._buffers.get(shape_type)
+        if columns is None:
+            columns = self._buffers[shape_type] = [array('d') for _ in _columns(shape_type)]
+        values = tuple(params) + (area, circumscribed_radius, inscribed_radius)
+        if len(values) != len(columns):
+            raise ValueError(f"Для {shape_type} нужны параметры {SHAPE_CLASSES[shape_type].FIELDS}")
+        for column, value in zip(columns, values):
+            column.append(math.nan if value is None else value)
+        if len(columns[0]) >= self.block_rows:
+            self._flush(shape_type)
+
+    def write_shape(self, shape):
+        self.write(shape.shape_type, shape.parameters, shape.area,
+                   shape.circumscribed_radius, shape.inscribed_radius)
+
+    def write_columns(self, shape_type: str, *columns):
+        """Готовые столбцы (параметры и характеристики, массивы numpy) одним блоком"""
+        if len(columns) != len(_columns(shape_type)):
+            raise ValueError(f"Ожидаются столбцы {_columns(shape_type)}")
+        np = batch._require_numpy()
+        self._flush(shape_type)
+        self._write_block(shape_type, [np.ascontiguousarray(c, dtype="<f8") for c in columns])
+
+    def _flush(self, shape_type: str):
+        columns = self._buffers.pop(shape_type, None)
+        if columns and len(columns[0]):
+            self._write_block(shape_type, columns)
+
+    def _write_block(self, shape_type: str, columns: list):
+        rows = len(columns[0])
+        if any(len(c) != rows for c in columns):
+            raise ValueError("Все столбцы должны иметь одинаковую длину")
+        self._file.write(BLOCK_HEADER.pack(SHAPE_TYPES.index(shape_type),
+                                           len(SHAPE_CLASSES[shape_type].FIELDS), rows))
+        for column in columns:
+            if isinstance(column, array) and sys.byteorder == "big":
+                column = array('d', column)
+                column.byteswap()
+            column.tofile(self._file)
+        self.blocks += 1
+        self.rows += rows
+
+    def close(self):
+        if self._file.closed:
+            return
+        for shape_type in list(self._buffers):
+            self._flush(shape_type)
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.blocks, self.rows))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Block:
+    """Блок одного типа фигур: столбцы — представления memmap без копирования"""
+
+    def __init__(self, shape_type: str, columns: dict):
+        self.shape_type = shape_type
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns['area'])
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def to_array(self):
+        """ShapeArray на тех же данных с уже заполненными характеристиками"""
+        from geometry_package import shape_array
+        shapes = getattr(shape_array, f"{self.shape_type}Array")(
+            *(self.columns[name] for name in SHAPE_CLASSES[self.shape_type].FIELDS))
+        shapes._metrics = batch.BatchResult(*(self.columns[name] for name in METRICS))
+        return shapes
+
+
+class Dataset:
+    """Чтение набора фигур через memory map"""
+
+    def __init__(self, path: str):
+        np = batch._require_numpy()
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, blocks, rows = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: не файл набора фигур")
+        if version != VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия формата {version}")
+        self.rows = rows
+        self.blocks: List[Block] = []
+        offset = HEADER.size
+        for _ in range(blocks):
+            code, fields, count = BLOCK_HEADER.unpack_from(self._map, offset)
+            offset += BLOCK_HEADER.size
+            shape_type = SHAPE_TYPES[code]
+            columns = {}
+            for name in _columns(shape_type):
+                columns[name] = np.ndarray((count,), dtype="<f8", buffer=self._map,
+                                           offset=offset)
+                offset += count * 8
+            self.blocks.append(Block(shape_type, columns))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def counts(self) -> Dict[str, int]:
+        """Количество строк по типам фигур"""
+        result: Dict[str, int] = {}
+        for block in self.blocks:
+            result[block.shape_type] = result.get(block.shape_type, 0) + len(block)
+        return result
+
+    def iter_blocks(self, shape_type: Optional[str] = None) -> Iterator[Block]:
+        for block in self.blocks:
+            if shape_type is None or block.shape_type == shape_type:
+                yield block
+
+    def column(self, shape_type: str, name: str):
+        """Столбец типа целиком (копия, если он занимает несколько блоков)"""
+        parts = [block[name] for block in self.iter_blocks(shape_type)]
+        if len(parts) == 1:
+            return parts[0]
+        np = batch._require_numpy()
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def close(self):
+        # Отображение освобождается, когда не останется представлений столбцов
+        self._map = None
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ---------------- Обмен с таблицей calculations -----------------
+def export_calculations(db: DatabaseManager, path: str, shape_type: Optional[str] = None,
+                        batch_size: int = 10_000, block_rows: int = 65_536) -> int:
+    """
+    Запись истории в файл набора (курсор читается порциями).
+    Строки без разобранных параметров пропускаются. Возвращает число строк.
+    """
+    where, args = "WHERE param1 IS NOT NULL", []
+    if shape_type:
+        where += " AND shape_type = ?"
+        args.append(shape_type)
+    cursor = db._connect().execute(f"""
+        SELECT shape_type, param1, param2, param3, area, circumscribed_radius, inscribed_radius
+        FROM calculations {where} ORDER BY id
+    """, args)
+    with DatasetWriter(path, block_rows) as writer:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                fields = len(SHAPE_CLASSES[row[0]].FIELDS)
+                writer.write(row[0], row[1:1 + fields], *row[4:])
+    return writer.rows
+
+
+def _block_rows(block: Block) -> Iterator[tuple]:
+    """Строки shape_to_row() из блока"""
+    fields = SHAPE_CLASSES[block.shape_type].FIELDS
+    template = PARAMETER_FORMATS[block.shape_type]
+    params = zip(*(block[name].tolist() for name in fields))
+    metrics = zip(*(block[name].tolist() for name in METRICS))
+    for values, (area, circumscribed, inscribed) in zip(params, metrics):
+        yield (block.shape_type, template.format(**dict(zip(fields, values))), area,
+               None if circumscribed != circumscribed else circumscribed,
+               None if inscribed != inscribed else inscribed)
+
+
+def import_calculations(db: DatabaseManager, path: str, chunk_size: int = 10_000) -> int:
+    """Сохранение набора в таблицу calculations; возвращает число строк"""
+    total = 0
+    with Dataset(path) as dataset:
+        for block in dataset.iter_blocks():
+            total += len(db.save_calculations(_block_rows(block), chunk_size=chunk_size))
+    return total
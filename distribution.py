@@ -0,0 +1,222 @@
+"""Потоковые распределения характеристик из истории расчетов.
+
+Квантили (p50/p90/p99) и гистограммы площади и радиусов по типам фигур
+считаются в ограниченной памяти с помощью скетча KLL. Строки читаются из
+таблицы calculations порциями через fetchmany, скетчи обновляются по мере
+появления новых строк и объединяются между несколькими файлами БД.
+"""
+import math
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from database import DatabaseManager
+
+METRICS = ('area', 'circumscribed_radius', 'inscribed_radius')
+
+
+class KLLSketch:
+    """Объединяемый скетч квантилей KLL (Karnin, Lang, Liberty)"""
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.count = 0
+        self.min = None
+        self.max = None
+        # compactors[h] — элементы с весом 2**h
+        self.compactors: List[list] = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._random = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        height = len(self.compactors)
+        return int(math.ceil(self.k * (2 / 3) ** (height - level - 1))) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self):
+        """Сжатие первого переполненного уровня: половина элементов уходит выше"""
+        for level, items in enumerate(self.compactors):
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self._grow()
+                items.sort()
+                # Нечётный остаток остаётся на текущем уровне
+                keep = items.pop() if len(items) % 2 else None
+                offset = self._random.randint(0, 1)
+                self.compactors[level + 1].extend(items[offset::2])
+                items.clear()
+                if keep is not None:
+                    items.append(keep)
+                break
+        self._size = sum(len(c) for c in self.compactors)
+
+    def update(self, value: float):
+        """Добавление одного значения"""
+        self.compactors[0].append(value)
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        """Объединение с другим скетчем (результат — в self)"""
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._size = sum(len(c) for c in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def _weighted(self) -> List[Tuple[float, int]]:
+        items = [(value, 1 << level)
+                 for level, values in enumerate(self.compactors) for value in values]
+        items.sort()
+        return items
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Приближённые квантили для долей qs (0..1)"""
+        if not self.count:
+            return [None] * len(qs)
+        items = self._weighted()
+        total = sum(weight for _, weight in items)
+        result = []
+        for q in qs:
+            if q <= 0:
+                result.append(self.min)
+                continue
+            if q >= 1:
+                result.append(self.max)
+                continue
+            target = q * total
+            cumulative = 0
+            for value, weight in items:
+                cumulative += weight
+                if cumulative >= target:
+                    result.append(value)
+                    break
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+    def histogram(self, bins: int = 10,
+                  value_range: Optional[Tuple[float, float]] = None) -> List[Tuple[float, float, int]]:
+        """Гистограмма (нижняя граница, верхняя граница, приближённое количество)"""
+        if not self.count:
+            return []
+        low, high = value_range or (self.min, self.max)
+        width = (high - low) / bins or 1.0
+        counts = [0] * bins
+        for value, weight in self._weighted():
+            if low <= value <= high:
+                counts[min(int((value - low) / width), bins - 1)] += weight
+        return [(low + i * width, low + (i + 1) * width, c)
+                for i, c in enumerate(counts)]
+
+    def to_dict(self) -> dict:
+        """Сериализуемое представление (например, для хранения в JSON)"""
+        return {'k': self.k, 'count': self.count, 'min': self.min, 'max': self.max,
+                'compactors': [list(c) for c in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(data['k'])
+        sketch.count = data['count']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.compactors = [list(c) for c in data['compactors']]
+        sketch._size = sum(len(c) for c in sketch.compactors)
+        sketch._max_size = sum(sketch._capacity(h) for h in range(len(sketch.compactors)))
+        return sketch
+
+
+class DistributionStats:
+    """Скетчи характеристик по типам фигур с инкрементальным обновлением"""
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.seed = seed
+        self.sketches: Dict[Tuple[str, str], KLLSketch] = {}
+        # Последний учтённый id для каждого файла БД
+        self.positions: Dict[str, int] = {}
+
+    def _sketch(self, shape_type: str, metric: str) -> KLLSketch:
+        key = (shape_type, metric)
+        if key not in self.sketches:
+            self.sketches[key] = KLLSketch(self.k, self.seed)
+        return self.sketches[key]
+
+    def observe(self, shape_type: str, area: float,
+                circumscribed_radius: Optional[float] = None,
+                inscribed_radius: Optional[float] = None):
+        """Учёт одного расчёта (например, сразу после сохранения)"""
+        for metric, value in zip(METRICS, (area, circumscribed_radius, inscribed_radius)):
+            if value is not None:
+                self._sketch(shape_type, metric).update(value)
+
+    def update_from(self, db: DatabaseManager, batch_size: int = 10_000) -> int:
+        """
+        Учёт строк, появившихся в БД после предыдущего вызова.
+        Строки читаются курсором порциями, возвращает количество новых строк.
+        """
+        last_id = self.positions.get(db.db_name, 0)
+        cursor = db._connect().execute('''
+            SELECT id, shape_type, area, circumscribed_radius, inscribed_radius
+            FROM calculations WHERE id > ? ORDER BY id
+        ''', (last_id,))
+        seen = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for _, shape_type, area, circumscribed, inscribed in rows:
+                self.observe(shape_type, area, circumscribed, inscribed)
+            seen += len(rows)
+            last_id = rows[-1][0]
+        self.positions[db.db_name] = last_id
+        return seen
+
+    def merge(self, other: "DistributionStats"):
+        """Объединение со статистикой, собранной по другим файлам БД"""
+        for (shape_type, metric), sketch in other.sketches.items():
+            self._sketch(shape_type, metric).merge(sketch)
+        for name, last_id in other.positions.items():
+            self.positions[name] = max(self.positions.get(name, 0), last_id)
+
+    @classmethod
+    def from_databases(cls, paths: Iterable[str], **kwargs) -> "DistributionStats":
+        """Статистика по нескольким файлам БД, объединённая в одну"""
+        total = cls(**kwargs)
+        for path in paths:
+            part = cls(**kwargs)
+            with DatabaseManager(path) as db:
+                part.update_from(db)
+            total.merge(part)
+        return total
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> dict:
+        """{тип фигуры: {характеристика: {count, min, max, p50, ...}}}"""
+        result: dict = {}
+        for (shape_type, metric), sketch in sorted(self.sketches.items()):
+            row = {'count': sketch.count, 'min': sketch.min, 'max': sketch.max}
+            for q, value in zip(quantiles, sketch.quantiles(quantiles)):
+                row[f"p{q * 100:g}"] = value
+            result.setdefault(shape_type, {})[metric] = row
+        return result
+
+    def histogram(self, shape_type: str, metric: str = 'area',
+                  bins: int = 10) -> List[Tuple[float, float, int]]:
+        sketch = self.sketches.get((shape_type, metric))
+        return sketch.histogram(bins) if sketch else []
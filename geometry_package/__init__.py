@@ -1,6 +1,8 @@
 from geometry_package.rectangle import Rectangle
 from geometry_package.triangle import Triangle
 from geometry_package.trapezoid import Trapezoid
+from geometry_package.cache import MetricsCache
+from geometry_package.area_index import AreaIndex
 
-__all__ = ['Rectangle', 'Triangle', 'Trapezoid']
+__all__ = ['Rectangle', 'Triangle', 'Trapezoid', 'MetricsCache', 'AreaIndex']
 __version__ = '1.0.0'
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""Выборки фигур по площади без сортировки всего списка.
+
+Shape.__lt__ и __eq__ сравнивают фигуры по площади (равенство — с
+math.isclose, rel_tol=1e-9). AreaIndex хранит площади в отсортированном
+массиве и отвечает на запросы «k наибольших», «площадь в диапазоне» и
+«ближайшие по площади» через bisect, новые фигуры добавляются по одной.
+Для разовых запросов к обычному списку есть nlargest/nsmallest на куче.
+"""
+import heapq
+import math
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+from typing import Iterable, Iterator, List, Union
+
+from geometry_package.shape import Shape
+
+# Та же точность, что и в Shape.__eq__
+REL_TOL = 1e-9
+
+_area = attrgetter('area')
+
+
+def nlargest(shapes: Iterable[Shape], k: int) -> List[Shape]:
+    """k фигур с наибольшей площадью, O(n log k); как sorted(shapes, reverse=True)[:k]"""
+    return heapq.nlargest(k, shapes, key=_area)
+
+
+def nsmallest(shapes: Iterable[Shape], k: int) -> List[Shape]:
+    """k фигур с наименьшей площадью, O(n log k); как sorted(shapes)[:k]"""
+    return heapq.nsmallest(k, shapes, key=_area)
+
+
+class AreaIndex:
+    """Фигуры, упорядоченные по площади, с запросами через bisect"""
+
+    def __init__(self, shapes: Iterable[Shape] = ()):
+        self._areas: List[float] = []
+        self._shapes: List[Shape] = []
+        self.add_many(shapes)
+
+    def add(self, shape: Shape):
+        """Добавление фигуры за O(log n) сравнений (после равных по площади)"""
+        area = shape.area
+        i = bisect_right(self._areas, area)
+        self._areas.insert(i, area)
+        self._shapes.insert(i, shape)
+
+    def add_many(self, shapes: Iterable[Shape]):
+        """Добавление набора фигур одной пересортировкой"""
+        shapes = list(shapes)
+        if len(shapes) < 16:
+            for shape in shapes:
+                self.add(shape)
+            return
+        areas = self._areas + [shape.area for shape in shapes]
+        shapes = self._shapes + shapes
+        # Сортировка устойчива: равные по площади остаются в порядке добавления
+        order = sorted(range(len(areas)), key=areas.__getitem__)
+        self._areas = [areas[i] for i in order]
+        self._shapes = [shapes[i] for i in order]
+
+    def __len__(self) -> int:
+        return len(self._shapes)
+
+    def __iter__(self) -> Iterator[Shape]:
+        """Фигуры по возрастанию площади (как sorted(shapes))"""
+        return iter(self._shapes)
+
+    def top_k(self, k: int, largest: bool = True) -> List[Shape]:
+        """
+        k наибольших (или наименьших) фигур в том же порядке, что
+        sorted(shapes, reverse=True)[:k] (или sorted(shapes)[:k]).
+        """
+        if k <= 0:
+            return []
+        if not largest:
+            return self._shapes[:k]
+        # Равные по площади идут в порядке добавления, поэтому берём их блоками
+        result = []
+        end = len(self._areas)
+        while end and len(result) < k:
+            start = bisect_left(self._areas, self._areas[end - 1], 0, end)
+            result.extend(self._shapes[start:end])
+            end = start
+        return result[:k]
+
+    def range(self, low: float, high: float) -> List[Shape]:
+        """Фигуры с площадью от low до high включительно (с допуском isclose)"""
+        lo = bisect_left(self._areas, low)
+        while lo > 0 and math.isclose(self._areas[lo - 1], low, rel_tol=REL_TOL):
+            lo -= 1
+        hi = bisect_right(self._areas, high)
+        while hi < len(self._areas) and math.isclose(self._areas[hi], high, rel_tol=REL_TOL):
+            hi += 1
+        return self._shapes[lo:hi]
+
+    def equal(self, shape: Shape) -> List[Shape]:
+        """Фигуры, равные данной по Shape.__eq__"""
+        return self.range(shape.area, shape.area)
+
+    def nearest(self, target: Union[float, Shape], k: int = 1) -> List[Shape]:
+        """k фигур с площадью, ближайшей к target (числу или площади фигуры)"""
+        if isinstance(target, Shape):
+            target = target.area
+        areas = self._areas
+        right = bisect_left(areas, target)
+        left = right - 1
+        result = []
+        # Расширяемся в обе стороны от точки вставки
+        while len(result) < k and (left >= 0 or right < len(areas)):
+            if right >= len(areas) or (left >= 0 and target - areas[left] <= areas[right] - target):
+                result.append(self._shapes[left])
+                left -= 1
+            else:
+                result.append(self._shapes[right])
+                right += 1
+        return result
@@ -0,0 +1,185 @@
+"""Векторизованный расчёт характеристик фигур на массивах параметров.
+
+Функции принимают столбцы параметров (любые последовательности чисел или
+массивы NumPy) и возвращают столбцы площади, радиуса описанной и радиуса
+вписанной окружностей. Формулы совпадают с классами Rectangle, Triangle
+и Trapezoid; несуществующие значения (например, вписанная окружность
+прямоугольника, не являющегося квадратом) возвращаются как NaN.
+"""
+from importlib.util import find_spec
+from typing import NamedTuple
+
+# numpy импортируется при первом расчёте, проверка наличия — без импорта
+NUMPY_AVAILABLE = find_spec("numpy") is not None
+np = None
+
+# Та же относительная точность, что и в math.isclose у классов фигур
+REL_TOL = 1e-9
+
+
+class BatchResult(NamedTuple):
+    """Столбцы характеристик фигур"""
+    area: "np.ndarray"
+    circumscribed_radius: "np.ndarray"
+    inscribed_radius: "np.ndarray"
+
+    @property
+    def inscribed_mask(self) -> "np.ndarray":
+        """Маска строк, для которых вписанная окружность существует"""
+        return ~np.isnan(self.inscribed_radius)
+
+    @property
+    def circumscribed_mask(self) -> "np.ndarray":
+        """Маска строк, для которых описанная окружность существует"""
+        return ~np.isnan(self.circumscribed_radius)
+
+
+def _require_numpy():
+    """Модуль numpy (импортируется при первом вызове)"""
+    global np
+    if not NUMPY_AVAILABLE:
+        raise ImportError("Для пакетных расчётов требуется numpy")
+    if np is None:
+        import numpy as np
+    return np
+
+
+def _columns(*columns):
+    """Приводит столбцы к float64 и проверяет совпадение длин"""
+    _require_numpy()
+    arrays = [np.asarray(c, dtype=np.float64) for c in columns]
+    shape = arrays[0].shape
+    if any(a.shape != shape for a in arrays[1:]):
+        raise ValueError("Все столбцы параметров должны иметь одинаковую длину")
+    return arrays
+
+
+def _isclose(x, y):
+    """Аналог math.isclose(x, y, rel_tol=REL_TOL) для массивов"""
+    return np.abs(x - y) <= REL_TOL * np.maximum(np.abs(x), np.abs(y))
+
+
+def rectangles(width, height) -> BatchResult:
+    """Характеристики прямоугольников по столбцам ширин и высот"""
+    width, height = _columns(width, height)
+
+    area = width * height
+    circumscribed = np.sqrt(width ** 2 + height ** 2) / 2
+    # Вписанная окружность существует только для квадрата
+    inscribed = np.where(_isclose(width, height),
+                         np.minimum(width, height) / 2, np.nan)
+    return BatchResult(area, circumscribed, inscribed)
+
+
+def triangles(a, b, c) -> BatchResult:
+    """Характеристики треугольников по столбцам длин сторон"""
+    a, b, c = _columns(a, b, c)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Формула Герона
+        s = (a + b + c) / 2
+        area = np.sqrt(s * (s - a) * (s - b) * (s - c))
+        # R = abc / 4S
+        circumscribed = (a * b * c) / (4 * area)
+        # r = 2S / (a + b + c)
+        inscribed = (2 * area) / (a + b + c)
+    return BatchResult(area, circumscribed, inscribed)
+
+
+def trapezoids(base1, base2, height) -> BatchResult:
+    """Характеристики равнобедренных трапеций по основаниям и высоте"""
+    base1, base2, height = _columns(base1, base2, height)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        area = (base1 + base2) * height / 2
+        side = np.sqrt((np.abs(base1 - base2) / 2) ** 2 + height ** 2)
+
+        shorter = np.minimum(base1, base2)
+        longer = np.maximum(base1, base2)
+        diagonal = np.sqrt(shorter * longer + side ** 2)
+        circumscribed = (side * diagonal) / (2 * height)
+
+        # Вписанная окружность существует, если суммы противоположных сторон равны
+        inscribed = np.where(_isclose(base1 + base2, 2 * side), height / 2, np.nan)
+    return BatchResult(area, circumscribed, inscribed)
+
+
+# ---------------- Проверка параметров -----------------
+# Коды причин отклонения строки
+VALID = 0
+NOT_FINITE = 1
+NON_POSITIVE = 2
+TRIANGLE_INEQUALITY = 3
+
+
+class ValidationResult(NamedTuple):
+    """Маска корректных строк и код причины для каждой строки"""
+    mask: "np.ndarray"
+    reasons: "np.ndarray"
+    # Сообщение для каждого кода причины (как в ValueError у validate())
+    messages: dict
+
+    @property
+    def invalid_indices(self) -> "np.ndarray":
+        return np.flatnonzero(~self.mask)
+
+    def errors(self):
+        """(номер строки, сообщение) для каждой отклонённой строки"""
+        for i in self.invalid_indices:
+            yield int(i), self.messages[int(self.reasons[i])]
+
+
+def _reasons(columns, positive_message: str, extra=()) -> ValidationResult:
+    """
+    Коды причин по порядку проверок: нечисловые значения, неположительные
+    значения, затем дополнительные проверки extra — пары (маска нарушения, код).
+    """
+    reasons = np.zeros(columns[0].shape, dtype=np.int8)
+    finite = np.logical_and.reduce([np.isfinite(c) for c in columns])
+    positive = np.logical_and.reduce([c > 0 for c in columns])
+    checks = [(~finite, NOT_FINITE), (~positive, NON_POSITIVE)] + list(extra)
+    # Проверки в обратном порядке: у строки остаётся код первой нарушенной
+    for violated, code in reversed(checks):
+        reasons[violated] = code
+    messages = {NOT_FINITE: "Параметры должны быть конечными числами",
+                NON_POSITIVE: positive_message,
+                TRIANGLE_INEQUALITY: "Треугольник с такими сторонами не существует"}
+    return ValidationResult(reasons == VALID, reasons, messages)
+
+
+def validate_rectangles(width, height) -> ValidationResult:
+    """Проверка столбцов прямоугольников (как Rectangle.validate)"""
+    columns = _columns(width, height)
+    return _reasons(columns, "Ширина и высота должны быть положительными")
+
+
+def validate_triangles(a, b, c) -> ValidationResult:
+    """Проверка столбцов треугольников: положительность и неравенство треугольника"""
+    a, b, c = columns = _columns(a, b, c)
+    with np.errstate(invalid="ignore"):
+        inequality = ~((a + b > c) & (a + c > b) & (b + c > a))
+    return _reasons(columns, "Все стороны должны быть положительными",
+                    [(inequality, TRIANGLE_INEQUALITY)])
+
+
+def validate_trapezoids(base1, base2, height) -> ValidationResult:
+    """Проверка столбцов трапеций (как Trapezoid.validate)"""
+    columns = _columns(base1, base2, height)
+    return _reasons(columns, "Все параметры должны быть положительными")
+
+
+KERNELS = {'Rectangle': rectangles, 'Triangle': triangles, 'Trapezoid': trapezoids}
+VALIDATORS = {'Rectangle': validate_rectangles, 'Triangle': validate_triangles,
+              'Trapezoid': validate_trapezoids}
+
+
+def calculate_valid(shape_type: str, *columns):
+    """
+    Проверка и расчёт за один проход без исключений по строкам.
+    Возвращает (ValidationResult, BatchResult); у отклонённых строк все
+    характеристики — NaN.
+    """
+    validation = VALIDATORS[shape_type](*columns)
+    result = KERNELS[shape_type](*columns)
+    return validation, BatchResult(*(np.where(validation.mask, values, np.nan)
+                                     for values in result))
@@ -0,0 +1,95 @@
+"""Кэш характеристик фигур для повторяющихся наборов параметров.
+
+Ключ — тип фигуры и нормализованные параметры. Характеристики не зависят
+от порядка сторон треугольника, оснований трапеции и сторон прямоугольника,
+поэтому такие перестановки делят одну запись кэша.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from geometry_package.shape import Shape, UNSET
+
+Metrics = Tuple[float, Optional[float], Optional[float]]
+
+
+def normalize_key(shape_type: str, params) -> tuple:
+    """Ключ кэша: тип фигуры и параметры в каноническом порядке"""
+    params = tuple(float(p) for p in params)
+    if shape_type in ('Triangle', 'Rectangle'):
+        params = tuple(sorted(params))
+    elif shape_type == 'Trapezoid':
+        params = tuple(sorted(params[:2])) + params[2:]
+    return (shape_type,) + params
+
+
+class MetricsCache:
+    """Ограниченный LRU-кэш (площадь, R, r) со счётчиками попаданий"""
+
+    def __init__(self, maxsize: int = 10_000):
+        if maxsize <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[tuple, Metrics]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Metrics]:
+        with self._lock:
+            metrics = self._data.get(key)
+            if metrics is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return metrics
+
+    def put(self, key: tuple, metrics: Metrics):
+        with self._lock:
+            self._data[key] = metrics
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def metrics(self, shape: Shape) -> Metrics:
+        """
+        Характеристики фигуры из кэша или с вычислением.
+        При попадании значения сразу записываются в кэш самого объекта.
+        """
+        key = normalize_key(shape.shape_type, shape.parameters)
+        metrics = self.get(key)
+        if metrics is None:
+            metrics = (shape.area, shape.circumscribed_radius, shape.inscribed_radius)
+            self.put(key, metrics)
+        elif getattr(shape, '_area', None) is UNSET:
+            shape._area, shape._circumscribed_radius, shape._inscribed_radius = metrics
+        return metrics
+
+    def create(self, cls, *params) -> Shape:
+        """Создание фигуры с характеристиками из кэша"""
+        shape = cls(*params)
+        self.metrics(shape)
+        return shape
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
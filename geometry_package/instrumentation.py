@@ -0,0 +1,238 @@
+"""Счётчики и гистограммы времени выполнения горячих участков.
+
+Включается переменной окружения GEOMETRY_METRICS=1 (читается при импорте).
+Выключенная инструментация ничего не оборачивает: декораторы возвращают
+исходные функции, поэтому накладных расходов нет.
+
+Снимок метрик пишется в файл по запросу (dump()), по сигналу SIGUSR1,
+при завершении процесса и периодически:
+    GEOMETRY_METRICS_FILE      — путь к файлу (.json — JSON, иначе формат Prometheus)
+    GEOMETRY_METRICS_INTERVAL  — период записи в секундах (0 — без периодической записи)
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional
+
+ENABLED = os.getenv("GEOMETRY_METRICS") == "1"
+
+# Верхние границы корзин гистограммы, секунды
+BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3,
+           1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+# Флаг кода функции-генератора (inspect.CO_GENERATOR; inspect не импортируется
+# ради быстрого старта)
+CO_GENERATOR = 0x20
+
+
+class Timing:
+    """Количество вызовов, ошибок, суммарное время и гистограмма"""
+
+    __slots__ = ('count', 'errors', 'total', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'errors': self.errors, 'sum': self.total,
+                'buckets': dict(zip(map(str, BUCKETS), self.buckets))}
+
+
+class Registry:
+    """Потокобезопасный набор метрик по именам участков"""
+
+    def __init__(self):
+        self._timings: Dict[str, Timing] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, error: bool = False):
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = Timing()
+            timing.count += 1
+            timing.errors += error
+            timing.total += seconds
+            timing.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> dict:
+        """{имя участка: {count, errors, sum, buckets}}"""
+        with self._lock:
+            return {name: t.to_dict() for name, t in sorted(self._timings.items())}
+
+    def clear(self):
+        with self._lock:
+            self._timings.clear()
+
+
+REGISTRY = Registry()
+
+
+def timed(name: str) -> Callable:
+    """
+    Декоратор замера времени вызова (без инструментации — без изменений).
+    У генераторов замеряется весь проход: время всех шагов генератора без
+    обработки элементов вызывающим кодом; одна запись на проход.
+    """
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        clock = time.perf_counter
+        record = REGISTRY.record
+
+        code = getattr(fn, '__code__', None)
+        if code is not None and code.co_flags & CO_GENERATOR:
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                elapsed = 0.0
+                generator = fn(*args, **kwargs)
+                try:
+                    while True:
+                        start = clock()
+                        try:
+                            item = next(generator)
+                        except StopIteration as stop:
+                            record(name, elapsed + clock() - start)
+                            return stop.value
+                        except BaseException:
+                            record(name, elapsed + clock() - start, True)
+                            raise
+                        elapsed += clock() - start
+                        yield item
+                except GeneratorExit:
+                    # Проход прерван вызывающим кодом — это не ошибка
+                    generator.close()
+                    record(name, elapsed)
+                    raise
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                record(name, clock() - start, True)
+                raise
+            record(name, clock() - start)
+            return result
+        return wrapper
+    return decorator
+
+
+def instrument_properties(cls, names: Iterable[str], prefix: str):
+    """Замер времени чтения свойств, объявленных в самом классе cls"""
+    if not ENABLED:
+        return
+    for attr in names:
+        prop = cls.__dict__.get(attr)
+        if isinstance(prop, property) and prop.fget is not None:
+            setattr(cls, attr, property(timed(f"{prefix}.{attr}")(prop.fget),
+                                        prop.fset, prop.fdel, prop.__doc__))
+
+
+def instrument_methods(cls, prefix: str):
+    """Замер времени публичных методов, объявленных в самом классе cls"""
+    if not ENABLED:
+        return
+    for attr, value in list(cls.__dict__.items()):
+        if not attr.startswith('_') and callable(value):
+            setattr(cls, attr, timed(f"{prefix}.{attr}")(value))
+
+
+# ---------------- Экспорт -----------------
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def to_prometheus(snapshot: Optional[dict] = None) -> str:
+    """Снимок в текстовом формате Prometheus"""
+    snapshot = REGISTRY.snapshot() if snapshot is None else snapshot
+    lines = ["# HELP geometry_call_duration_seconds Время выполнения участка",
+             "# TYPE geometry_call_duration_seconds histogram"]
+    for name, t in snapshot.items():
+        label = f'function="{_label(name)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, t['buckets'].values()):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'geometry_call_duration_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+        lines.append(f"geometry_call_duration_seconds_sum{{{label}}} {t['sum']!r}")
+        lines.append(f"geometry_call_duration_seconds_count{{{label}}} {t['count']}")
+    lines += ["# HELP geometry_call_errors_total Вызовы, завершившиеся исключением",
+              "# TYPE geometry_call_errors_total counter"]
+    for name, t in snapshot.items():
+        lines.append(f'geometry_call_errors_total{{function="{_label(name)}"}} {t["errors"]}')
+    return "\n".join(lines) + "\n"
+
+
+def dump(path: Optional[str] = None, fmt: Optional[str] = None) -> Optional[str]:
+    """
+    Запись снимка в файл (атомарно, через временный файл).
+    fmt — 'json' или 'prometheus'; по умолчанию по расширению файла.
+    Возвращает путь или None, если файл не задан.
+    """
+    path = path or os.getenv("GEOMETRY_METRICS_FILE")
+    if not path:
+        return None
+    fmt = fmt or ('json' if path.endswith('.json') else 'prometheus')
+    snapshot = REGISTRY.snapshot()
+    if fmt == 'json':
+        text = json.dumps({'timestamp': time.time(), 'metrics': snapshot},
+                          ensure_ascii=False, indent=2)
+    else:
+        text = to_prometheus(snapshot)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return path
+
+
+class PeriodicDump:
+    """Фоновая запись снимка в файл каждые interval секунд"""
+
+    def __init__(self, path: str, interval: float, fmt: Optional[str] = None):
+        self.path = path
+        self.interval = interval
+        self.fmt = fmt
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            dump(self.path, self.fmt)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        dump(self.path, self.fmt)
+
+
+def _setup():
+    """Запись по переменным окружения: периодически, по SIGUSR1 и при выходе"""
+    path = os.getenv("GEOMETRY_METRICS_FILE")
+    if not path:
+        return
+    interval = float(os.getenv("GEOMETRY_METRICS_INTERVAL", "0"))
+    if interval > 0:
+        PeriodicDump(path, interval)
+    atexit.register(dump, path)
+    try:
+        import signal
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump(path))
+    except (AttributeError, ValueError):
+        # Нет SIGUSR1 (Windows) или импорт не из главного потока
+        pass
+
+
+if ENABLED:
+    _setup()
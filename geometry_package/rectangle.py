@@ -1,11 +1,16 @@
-from geometry_package.shape import Shape
+from geometry_package.shape import Shape, UNSET
 from typing import Optional
 import math
 
 class Rectangle(Shape):
     """Класс прямоугольника"""
 
+    __slots__ = ('_width', '_height')
+
+    FIELDS = ('width', 'height')
+
     def __init__(self, width: float, height: float):
+        super().__init__()
         self._width = width
         self._height = height
         self.validate()
@@ -17,8 +22,7 @@ class Rectangle(Shape):
     @width.setter
     def width(self, value: float):
         self._width = value
-        self._area = None
-        self._circumscribed_radius = None
+        self._reset_cache()
 
     @property
     def height(self) -> float:
@@ -27,29 +31,36 @@ class Rectangle(Shape):
     @height.setter
     def height(self, value: float):
         self._height = value
-        self._area = None
-        self._circumscribed_radius = None
+        self._reset_cache()
+
+    @property
+    def parameters(self) -> tuple:
+        """Параметры в порядке аргументов конструктора"""
+        return (self._width, self._height)
 
     @property
     def area(self) -> float:
-        if self._area is None:
-            self._area = self.width * self.height
+        if self._area is UNSET:
+            self._area = self._width * self._height
         return self._area
 
     @property
     def circumscribed_radius(self) -> float:
-        if self._circumscribed_radius is None:
+        if self._circumscribed_radius is UNSET:
             # Диагональ прямоугольника / 2
-            diagonal = math.sqrt(self.width ** 2 + self.height ** 2)
+            diagonal = math.sqrt(self._width ** 2 + self._height ** 2)
             self._circumscribed_radius = diagonal / 2
         return self._circumscribed_radius
 
     @property
     def inscribed_radius(self) -> Optional[float]:
-        # Вписанная окружность существует только для квадрата
-        if math.isclose(self.width, self.height, rel_tol=1e-9):
-            return min(self.width, self.height) / 2
-        return None
+        if self._inscribed_radius is UNSET:
+            # Вписанная окружность существует только для квадрата
+            if math.isclose(self._width, self._height, rel_tol=1e-9):
+                self._inscribed_radius = min(self._width, self._height) / 2
+            else:
+                self._inscribed_radius = None
+        return self._inscribed_radius
 
     def validate(self) -> bool:
         if self.width <= 0 or self.height <= 0:
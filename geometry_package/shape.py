@@ -1,19 +1,60 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
 from typing import Optional
 import math
 
+from geometry_package import instrumentation
+
+class _Unset:
+    """Маркер "характеристика ещё не вычислена" (None — допустимый результат)"""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return 'UNSET'
+
+    def __reduce__(self):
+        # pickle и copy возвращают тот же объект модуля, проверки "is UNSET" сохраняются
+        return 'UNSET'
+
+
+UNSET = _Unset()
+
 
-@dataclass
 class Shape(ABC):
     """Абстрактный базовый класс для геометрических фигур"""
 
+    # Кэш характеристик хранится в слотах экземпляра, без __dict__
+    __slots__ = ('_area', '_circumscribed_radius', '_inscribed_radius')
+
+    # Имена аргументов конструктора
+    FIELDS = ()
+
     def __init_subclass__(cls, **kwargs):
-        """Добавляем managed-атрибуты при создании подкласса"""
         super().__init_subclass__(**kwargs)
-        cls._area = None
-        cls._circumscribed_radius = None
-        cls._inscribed_radius = None
+        # При GEOMETRY_METRICS=1 чтение характеристик попадает в метрики
+        instrumentation.instrument_properties(
+            cls, ('area', 'circumscribed_radius', 'inscribed_radius'), f'shape.{cls.__name__}')
+
+    def __init__(self):
+        self._area = UNSET
+        self._circumscribed_radius = UNSET
+        self._inscribed_radius = UNSET
+
+    def _reset_cache(self):
+        """Сброс кэша характеристик"""
+        self._area = UNSET
+        self._circumscribed_radius = UNSET
+        self._inscribed_radius = UNSET
+
+    @property
+    def parameters(self) -> tuple:
+        """Параметры в порядке аргументов конструктора"""
+        return ()
+
+    @property
+    def shape_type(self) -> str:
+        """Имя типа фигуры (значение столбца shape_type в БД)"""
+        return type(self).__name__
 
     @property
     @abstractmethod
@@ -43,7 +84,9 @@ class Shape(ABC):
         return f"{self.__class__.__name__}: площадь={self.area:.2f}"
 
     def __repr__(self) -> str:
-        return f"{self.__class__.__name__}({self.__dict__})"
+        params = ", ".join(f"{name}={value}"
+                           for name, value in zip(self.FIELDS, self.parameters))
+        return f"{self.__class__.__name__}({params})"
 
     def __eq__(self, other) -> bool:
         if not isinstance(other, Shape):
@@ -0,0 +1,204 @@
+"""Колоночное хранилище фигур одного типа.
+
+ShapeArray хранит параметры фигур в непрерывных массивах float64 (по
+столбцу на параметр), а характеристики вычисляет лениво сразу для всего
+массива через geometry_package.batch. Индексация целым числом возвращает
+лёгкое представление ShapeView с тем же API, что и у Shape.
+"""
+from typing import Iterable, Optional
+
+from geometry_package import batch
+from geometry_package.shape import Shape
+from geometry_package.rectangle import Rectangle
+from geometry_package.triangle import Triangle
+from geometry_package.trapezoid import Trapezoid
+
+
+def _np():
+    """Модуль numpy (импортируется при первом обращении, см. batch._require_numpy)"""
+    return batch._require_numpy()
+
+
+class ShapeView(Shape):
+    """Представление одной строки ShapeArray"""
+
+    __slots__ = ('_owner', '_index')
+
+    def __init__(self, owner: "ShapeArray", index: int):
+        self._owner = owner
+        self._index = index
+
+    def __getattr__(self, name):
+        # Доступ к параметрам по именам аргументов конструктора (width, a, base1...)
+        owner = object.__getattribute__(self, '_owner')
+        if name in owner.FIELDS:
+            return float(owner.column(name)[self._index])
+        raise AttributeError(name)
+
+    @staticmethod
+    def _optional(value) -> Optional[float]:
+        value = float(value)
+        return None if value != value else value
+
+    @property
+    def parameters(self) -> tuple:
+        return tuple(float(c[self._index]) for c in self._owner.columns)
+
+    @property
+    def shape_type(self) -> str:
+        """Тип фигуры строки, а не имя класса представления"""
+        return self._owner.shape_class.__name__
+
+    @property
+    def area(self) -> float:
+        return float(self._owner.area[self._index])
+
+    @property
+    def circumscribed_radius(self) -> Optional[float]:
+        return self._optional(self._owner.circumscribed_radius[self._index])
+
+    @property
+    def inscribed_radius(self) -> Optional[float]:
+        return self._optional(self._owner.inscribed_radius[self._index])
+
+    def validate(self) -> bool:
+        return self.to_shape().validate()
+
+    def to_shape(self) -> Shape:
+        """Полноценный объект фигуры для этой строки"""
+        return self._owner.shape_class(*self.parameters)
+
+    def __repr__(self) -> str:
+        params = ", ".join(f"{name}={value}"
+                           for name, value in zip(self._owner.FIELDS, self.parameters))
+        return f"{self._owner.shape_class.__name__}View({params})"
+
+
+class ShapeArray:
+    """Базовый класс колоночного массива фигур"""
+
+    shape_class = None
+    kernel = None
+
+    def __init__(self, *columns):
+        np = _np()
+        if len(columns) != len(self.FIELDS):
+            raise TypeError(f"{type(self).__name__} ожидает столбцы {self.FIELDS}")
+        self.columns = tuple(np.ascontiguousarray(c, dtype=np.float64) for c in columns)
+        if any(c.ndim != 1 or len(c) != len(self.columns[0]) for c in self.columns):
+            raise ValueError("Все столбцы параметров должны быть одномерными и одной длины")
+        self._metrics = None
+
+    @property
+    def FIELDS(self) -> tuple:
+        return self.shape_class.FIELDS
+
+    # ---------------- Конструкторы -----------------
+    @classmethod
+    def from_shapes(cls, shapes: Iterable[Shape]) -> "ShapeArray":
+        """Массив из объектов фигур (или строк другого массива)"""
+        rows = [shape.parameters for shape in shapes]
+        if not rows:
+            return cls(*([()] * len(cls.shape_class.FIELDS)))
+        return cls(*zip(*rows))
+
+    @classmethod
+    def concatenate(cls, arrays: Iterable["ShapeArray"]) -> "ShapeArray":
+        """Объединение нескольких массивов одного типа"""
+        arrays = list(arrays)
+        if any(type(a) is not cls for a in arrays):
+            raise TypeError("Объединять можно только массивы одного типа фигур")
+        if not arrays:
+            return cls.from_shapes(())
+        np = _np()
+        result = cls(*(np.concatenate(cols) for cols in zip(*(a.columns for a in arrays))))
+        if all(a._metrics is not None for a in arrays):
+            result._metrics = batch.BatchResult(
+                *(np.concatenate(cols) for cols in zip(*(a._metrics for a in arrays))))
+        return result
+
+    # ---------------- Доступ к данным -----------------
+    def column(self, name: str):
+        """Столбец параметра по имени"""
+        return self.columns[self.FIELDS.index(name)]
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __getitem__(self, key):
+        np = _np()
+        if isinstance(key, (int, np.integer)):
+            index = int(key)
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("Индекс вне диапазона")
+            return ShapeView(self, index)
+
+        # Срез, булева маска или массив индексов
+        if not isinstance(key, slice):
+            key = np.asarray(key)
+            if key.dtype == bool and len(key) != len(self):
+                raise IndexError("Длина маски не совпадает с длиной массива")
+        result = type(self).__new__(type(self))
+        result.columns = tuple(c[key] for c in self.columns)
+        result._metrics = (None if self._metrics is None
+                           else batch.BatchResult(*(m[key] for m in self._metrics)))
+        return result
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ShapeView(self, index)
+
+    def to_shapes(self) -> list:
+        """Список полноценных объектов фигур"""
+        return [self.shape_class(*row) for row in zip(*(c.tolist() for c in self.columns))]
+
+    @property
+    def nbytes(self) -> int:
+        """Объём памяти под параметры и вычисленные характеристики"""
+        total = sum(c.nbytes for c in self.columns)
+        if self._metrics is not None:
+            total += sum(m.nbytes for m in self._metrics)
+        return total
+
+    # ---------------- Характеристики -----------------
+    @property
+    def metrics(self) -> batch.BatchResult:
+        """Все характеристики; вычисляются один раз для всего массива"""
+        if self._metrics is None:
+            self._metrics = type(self).kernel(*self.columns)
+        return self._metrics
+
+    @property
+    def area(self):
+        return self.metrics.area
+
+    @property
+    def circumscribed_radius(self):
+        return self.metrics.circumscribed_radius
+
+    @property
+    def inscribed_radius(self):
+        return self.metrics.inscribed_radius
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(len={len(self)})"
+
+
+class RectangleArray(ShapeArray):
+    """Колоночный массив прямоугольников"""
+    shape_class = Rectangle
+    kernel = staticmethod(batch.rectangles)
+
+
+class TriangleArray(ShapeArray):
+    """Колоночный массив треугольников"""
+    shape_class = Triangle
+    kernel = staticmethod(batch.triangles)
+
+
+class TrapezoidArray(ShapeArray):
+    """Колоночный массив трапеций"""
+    shape_class = Trapezoid
+    kernel = staticmethod(batch.trapezoids)
@@ -1,11 +1,16 @@
-from geometry_package.shape import Shape
+from geometry_package.shape import Shape, UNSET
 from typing import Optional
 import math
 
 class Trapezoid(Shape):
     """Класс трапеции (равнобедренной)"""
 
+    __slots__ = ('_base1', '_base2', '_height')
+
+    FIELDS = ('base1', 'base2', 'height')
+
     def __init__(self, base1: float, base2: float, height: float):
+        super().__init__()
         self._base1 = base1
         self._base2 = base2
         self._height = height
@@ -19,9 +24,14 @@ class Trapezoid(Shape):
     def height(self) -> float:
         return self._height
 
+    @property
+    def parameters(self) -> tuple:
+        """Параметры в порядке аргументов конструктора"""
+        return (self._base1, self._base2, self._height)
+
     @property
     def area(self) -> float:
-        if self._area is None:
+        if self._area is UNSET:
             self._area = (self._base1 + self._base2) * self._height / 2
         return self._area
 
@@ -36,7 +46,7 @@ class Trapezoid(Shape):
         # Описанная окружность существует только если трапеция равнобедренная
         # и суммы противоположных углов равны 180 градусам
         # Для упрощения считаем, что всегда существует для равнобедренной
-        if self._circumscribed_radius is None:
+        if self._circumscribed_radius is UNSET:
             # Используем формулу через стороны и диагонали
             a, b = sorted([self._base1, self._base2])
             c = self.side_length
@@ -46,10 +56,13 @@ class Trapezoid(Shape):
 
     @property
     def inscribed_radius(self) -> Optional[float]:
-        # Вписанная окружность существует если суммы противоположных сторон равны
-        if math.isclose(self._base1 + self._base2, 2 * self.side_length, rel_tol=1e-9):
-            return self._height / 2
-        return None
+        if self._inscribed_radius is UNSET:
+            # Вписанная окружность существует если суммы противоположных сторон равны
+            if math.isclose(self._base1 + self._base2, 2 * self.side_length, rel_tol=1e-9):
+                self._inscribed_radius = self._height / 2
+            else:
+                self._inscribed_radius = None
+        return self._inscribed_radius
 
     def validate(self) -> bool:
         if self._base1 <= 0 or self._base2 <= 0 or self._height <= 0:
@@ -1,4 +1,4 @@
-from geometry_package.shape import Shape
+from geometry_package.shape import Shape, UNSET
 from typing import Optional
 import math
 
@@ -6,7 +6,12 @@ import math
 class Triangle(Shape):
     """Класс треугольника (по трём сторонам)"""
 
+    __slots__ = ('_a', '_b', '_c')
+
+    FIELDS = ('a', 'b', 'c')
+
     def __init__(self, a: float, b: float, c: float):
+        super().__init__()
         self._a = a
         self._b = b
         self._c = c
@@ -16,9 +21,14 @@ class Triangle(Shape):
     def sides(self) -> tuple:
         return (self._a, self._b, self._c)
 
+    @property
+    def parameters(self) -> tuple:
+        """Параметры в порядке аргументов конструктора"""
+        return self.sides
+
     @property
     def area(self) -> float:
-        if self._area is None:
+        if self._area is UNSET:
             # Формула Герона
             s = (self._a + self._b + self._c) / 2
             self._area = math.sqrt(s * (s - self._a) * (s - self._b) * (s - self._c))
@@ -26,14 +36,14 @@ class Triangle(Shape):
 
     @property
     def circumscribed_radius(self) -> float:
-        if self._circumscribed_radius is None:
+        if self._circumscribed_radius is UNSET:
             # R = abc / 4S
             self._circumscribed_radius = (self._a * self._b * self._c) / (4 * self.area)
         return self._circumscribed_radius
 
     @property
     def inscribed_radius(self) -> float:
-        if self._inscribed_radius is None:
+        if self._inscribed_radius is UNSET:
             # r = 2S / (a + b + c)
             perimeter = self._a + self._b + self._c
             self._inscribed_radius = (2 * self.area) / perimeter
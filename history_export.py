@@ -0,0 +1,133 @@
+"""Потоковая выгрузка истории расчетов в CSV, JSONL и Parquet.
+
+Строки читаются курсором порциями (DatabaseManager.iter_calculations) и
+сразу пишутся в файл, поэтому память не зависит от размера истории.
+В Parquet каждая порция записывается отдельной группой строк (row group);
+нужен pyarrow, он импортируется только при выгрузке в Parquet.
+
+Запуск: python interface.py export --output history.csv [--shape Triangle]
+        [--from 2024-01-01] [--to 2024-12-31] [--format csv|jsonl|parquet]
+"""
+import csv
+import importlib.util
+import json
+import os
+import sys
+import time
+from typing import Callable, Optional
+
+from database import DatabaseManager
+
+FIELDS = ('id', 'shape_type', 'parameters', 'area',
+          'circumscribed_radius', 'inscribed_radius', 'timestamp')
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+def _format(path: str, fmt: Optional[str]) -> str:
+    fmt = fmt or os.path.splitext(path)[1].lower().lstrip('.')
+    if fmt not in FORMATS:
+        raise ValueError(f"Неподдерживаемый формат: {fmt} (ожидается {', '.join(FORMATS)})")
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise ImportError("Для выгрузки в Parquet требуется pyarrow")
+    return fmt
+
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(FIELDS)
+
+    def write(self, rows):
+        self._csv.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self._file.writelines(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n'
+                              for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Порция строк -> группа строк Parquet"""
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._schema = pa.schema([
+            ('id', pa.int64()), ('shape_type', pa.string()), ('parameters', pa.string()),
+            ('area', pa.float64()), ('circumscribed_radius', pa.float64()),
+            ('inscribed_radius', pa.float64()), ('timestamp', pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = [list(column) for column in zip(*rows)]
+        self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': _CsvWriter, 'jsonl': _JsonlWriter, 'parquet': _ParquetWriter}
+
+
+def export_history(db: DatabaseManager, path: str, fmt: Optional[str] = None,
+                   shape_type: Optional[str] = None, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None, batch_size: int = 10_000,
+                   progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Выгрузка истории (с фильтрами по типу фигуры и датам, включительно).
+    fmt — csv, jsonl или parquet; по умолчанию по расширению файла.
+    progress(выгружено, всего) вызывается после каждой порции.
+    Возвращает количество выгруженных строк.
+    """
+    writer = WRITERS[_format(path, fmt)](path)
+    done = 0
+    try:
+        # Число строк для прогресса и сами строки — из одного снимка БД
+        with db.snapshot():
+            total = db.count_calculations(shape_type, date_from, date_to) if progress else 0
+            for rows in db.iter_calculations(shape_type, date_from, date_to, batch_size):
+                writer.write(rows)
+                done += len(rows)
+                if progress:
+                    progress(done, total)
+    finally:
+        writer.close()
+    return done
+
+
+class ProgressPrinter:
+    """Вывод прогресса в stderr не чаще раза в interval секунд"""
+
+    def __init__(self, interval: float = 1.0, stream=None):
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self._start = time.perf_counter()
+        self._last = 0.0
+
+    def __call__(self, done: int, total: int):
+        now = time.perf_counter()
+        if now - self._last < self.interval and done < total:
+            return
+        self._last = now
+        elapsed = now - self._start
+        percent = f" ({done / total:.0%})" if total else ""
+        self.stream.write(f"\rВыгружено {done:,} из {total:,}{percent}, "
+                          f"{done / elapsed if elapsed else 0:,.0f} строк/с")
+        if done >= total:
+            self.stream.write("\n")
+        self.stream.flush()
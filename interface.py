@@ -1,37 +1,39 @@
+import argparse
+import importlib.util
 import sqlite3
 import os
 from datetime import datetime
 
+import batch_processing
+import database
+from geometry_package import instrumentation
+from geometry_package.cache import MetricsCache
 from geometry_package.rectangle import Rectangle
 from geometry_package.triangle import Triangle
 from geometry_package.trapezoid import Trapezoid
 
-# WORD-экспорт
-try:
-    from docx import Document
-    from docx.shared import Pt
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    WORD_AVAILABLE = True
-except ImportError:
-    WORD_AVAILABLE = False
+# WORD-экспорт: python-docx (с lxml) импортируется только при экспорте,
+# при запуске лишь проверяется, что модуль установлен
+WORD_AVAILABLE = importlib.util.find_spec("docx") is not None
 
 
 # =====================================================
 #                 DATABASE MANAGER
 # =====================================================
 
-class DatabaseManager:
-    """Менеджер для работы с SQLite"""
+class DatabaseManager(database.DatabaseManager):
+    """Менеджер для работы с SQLite (создаёт таблицу при необходимости)"""
 
-    def __init__(self, db_name: str = None):
-        # путь к БД — из ENV или default
-        self.db_name = db_name or os.getenv("DB_PATH", "geometry_calculations.db")
+    TIME_COLUMN = "strftime('%d.%m.%Y %H:%M', timestamp)"
+
+    def _init_schema(self):
         self._ensure_db()
+        self._migrate()
 
     def _ensure_db(self):
         """Создаёт таблицу, если её нет — обязательно для Docker"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS calculations (
@@ -48,25 +50,16 @@ class DatabaseManager:
         except sqlite3.Error as e:
             raise ConnectionError(f"Ошибка инициализации БД: {e}")
 
-    def save_calculation(self, shape_type, parameters, area, circ, insc):
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO calculations (shape_type, parameters, area, circumscribed_radius, inscribed_radius)
-                VALUES (?, ?, ?, ?, ?)
-            """, (shape_type, parameters, area, circ, insc))
-            conn.commit()
-
     def get_history(self):
-        with sqlite3.connect(self.db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, shape_type, parameters, area,
-                       circumscribed_radius, inscribed_radius,
-                       strftime('%d.%m.%Y %H:%M', timestamp)
-                FROM calculations ORDER BY timestamp DESC LIMIT 20
-            """)
-            return cursor.fetchall()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, shape_type, parameters, area,
+                   circumscribed_radius, inscribed_radius,
+                   strftime('%d.%m.%Y %H:%M', timestamp)
+            FROM calculations ORDER BY timestamp DESC LIMIT 20
+        """)
+        return cursor.fetchall()
 
 
 # =====================================================
@@ -75,8 +68,16 @@ class DatabaseManager:
 
 class GeometryConsoleApp:
     def __init__(self):
-        self.db = DatabaseManager()
+        # DB_WRITE_BEHIND=1 — сохранение в фоне, без ожидания commit
+        self.db = DatabaseManager(write_behind=os.getenv("DB_WRITE_BEHIND") == "1")
+        # GEOMETRY_CACHE_SIZE > 0 — кэш характеристик повторяющихся фигур
+        cache_size = int(os.getenv("GEOMETRY_CACHE_SIZE", "0"))
+        self.cache = MetricsCache(cache_size) if cache_size > 0 else None
+        # DB_DEDUP=1 — не сохранять повторно уже посчитанные фигуры
+        self.dedup = os.getenv("DB_DEDUP") == "1"
         self.current_calculation = None
+        # Сводные отчёты строятся в фоне (создаётся при первом отчёте)
+        self.reports = None
 
     def clear_screen(self):
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -88,7 +89,8 @@ class GeometryConsoleApp:
         print("2. Рассчитать треугольник")
         print("3. Рассчитать трапецию")
         print("4. Показать историю расчетов")
-        print("5. Выход\n")
+        print("5. Сводный отчёт по истории в Word")
+        print("6. Выход\n")
 
     def get_float(self, prompt):
         while True:
@@ -112,26 +114,33 @@ class GeometryConsoleApp:
             elif ans in ("нет", "н", "no", "n"):
                 return
 
+    def make_shape(self, cls, *params):
+        """Создаёт фигуру, беря характеристики из кэша, если он включён"""
+        if self.cache is None:
+            return cls(*params)
+        return self.cache.create(cls, *params)
+
+    def save_result(self, shape):
+        """Сохраняет расчёт в БД и запоминает его для экспорта"""
+        row = database.shape_to_row(shape)
+        if self.dedup:
+            self.db.save_calculation_unique(*row)
+        else:
+            self.db.save_calculation(*row)
+        self.current_calculation = (row[0], shape, row[1])
+
     # ---------------- RECTANGLE -----------------
     def calculate_rectangle(self):
         w = self.get_float("Введите ширину: ")
         h = self.get_float("Введите высоту: ")
 
-        rect = Rectangle(w, h)
+        rect = self.make_shape(Rectangle, w, h)
         print("\nРЕЗУЛЬТАТЫ:")
         print(f"Площадь: {rect.area:.4f}")
         print(f"R описанной: {rect.circumscribed_radius:.4f}")
         print(f"R вписанной: {rect.inscribed_radius if rect.inscribed_radius else 'нет'}")
 
-        self.db.save_calculation(
-            "Rectangle",
-            f"ширина={w}, высота={h}",
-            rect.area,
-            rect.circumscribed_radius,
-            rect.inscribed_radius
-        )
-
-        self.current_calculation = ("Rectangle", rect, f"ширина={w}, высота={h}")
+        self.save_result(rect)
         self.ask_save_word()
 
     # ---------------- TRIANGLE -----------------
@@ -144,7 +153,7 @@ class GeometryConsoleApp:
         b = self.get_float("Сторона B: ")
         c = self.get_float("Сторона C: ")
 
-        tri = Triangle(a, b, c)
+        tri = self.make_shape(Triangle, a, b, c)
 
         print("\nРЕЗУЛЬТАТЫ:")
         print(f"Площадь: {tri.area:.4f}")
@@ -152,15 +161,7 @@ class GeometryConsoleApp:
         print(f"R вписанной: {tri.inscribed_radius:.4f}")
         print("Тип: прямоугольный" if self.is_right_triangle(a, b, c) else "Тип: непрямоугольный")
 
-        self.db.save_calculation(
-            "Triangle",
-            f"{a},{b},{c}",
-            tri.area,
-            tri.circumscribed_radius,
-            tri.inscribed_radius
-        )
-
-        self.current_calculation = ("Triangle", tri, f"{a},{b},{c}")
+        self.save_result(tri)
         self.ask_save_word()
 
     # ---------------- TRAPEZOID -----------------
@@ -169,7 +170,7 @@ class GeometryConsoleApp:
         b2 = self.get_float("Второе основание: ")
         h = self.get_float("Высота: ")
 
-        trap = Trapezoid(b1, b2, h)
+        trap = self.make_shape(Trapezoid, b1, b2, h)
 
         print("\nРЕЗУЛЬТАТЫ:")
         print(f"Площадь: {trap.area:.4f}")
@@ -177,38 +178,44 @@ class GeometryConsoleApp:
         print(f"R описанной: {trap.circumscribed_radius or 'нет'}")
         print(f"R вписанной: {trap.inscribed_radius or 'нет'}")
 
-        self.db.save_calculation(
-            "Trapezoid",
-            f"{b1},{b2}, h={h}",
-            trap.area,
-            trap.circumscribed_radius,
-            trap.inscribed_radius
-        )
-
-        self.current_calculation = ("Trapezoid", trap, f"{b1},{b2}, h={h}")
+        self.save_result(trap)
         self.ask_save_word()
 
     # ---------------- HISTORY -----------------
-    def show_history(self):
-        rows = self.db.get_history()
-        print("\nИСТОРИЯ РАСЧЁТОВ:\n")
+    def show_history(self, page_size=20):
+        self.db.flush()
+        rows = self.db.get_history_page(page_size=page_size)
 
         if not rows:
+            print("\nИСТОРИЯ РАСЧЁТОВ:\n")
             print("История пуста")
             input("\nНажмите Enter...")
             return
 
-        print(f"{'ID':<4} {'Тип':<12} {'Параметры':<25} {'Площадь':<10} {'Rоп':<8} {'Rвп':<8} {'Время':<16}")
-        print("-" * 80)
-
-        for r in rows:
-            id_, t, p, area, r1, r2, tm = r
-            print(f"{id_:<4} {t:<12} {p:<25} {area:<10.2f} "
-                  f"{(r1 or '—'):<8} {(r2 or '—'):<8} {tm}")
-
-        input("\nНажмите Enter...")
+        while True:
+            self.clear_screen()
+            print("\nИСТОРИЯ РАСЧЁТОВ:\n")
+            print(f"{'ID':<4} {'Тип':<12} {'Параметры':<25} {'Площадь':<10} {'Rоп':<8} {'Rвп':<8} {'Время':<16}")
+            print("-" * 80)
+
+            for r in rows:
+                id_, t, p, area, r1, r2, tm = r
+                print(f"{id_:<4} {t:<12} {p:<25} {area:<10.2f} "
+                      f"{(r1 or '—'):<8} {(r2 or '—'):<8} {tm}")
+
+            c = input("\n[с] — старее, [н] — новее, Enter — назад: ").strip().lower()
+            if c in ("с", "c"):
+                page = self.db.get_history_page(before_id=rows[-1][0], page_size=page_size)
+            elif c in ("н", "n"):
+                page = self.db.get_history_page(after_id=rows[0][0], page_size=page_size)
+            else:
+                return
+            # На краю истории остаёмся на текущей странице
+            if page:
+                rows = page
 
     # ---------------- WORD EXPORT -----------------
+    @instrumentation.timed("word.save_to_word")
     def save_to_word(self):
         if not WORD_AVAILABLE:
             print("Модуль python-docx не установлен.")
@@ -218,6 +225,9 @@ class GeometryConsoleApp:
             print("Нет расчета для экспорта.")
             return
 
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
         shape_name, obj, params = self.current_calculation
 
         doc = Document()
@@ -255,23 +265,161 @@ class GeometryConsoleApp:
 
         print(f"Файл сохранён: {name}")
 
+    def export_report(self):
+        if not WORD_AVAILABLE:
+            print("Модуль python-docx не установлен.")
+            return
+
+        date_from = input("Дата начала ГГГГ-ММ-ДД (Enter — без ограничения): ").strip() or None
+        date_to = input("Дата окончания ГГГГ-ММ-ДД (Enter — без ограничения): ").strip() or None
+        shape_type = input("Тип фигуры Rectangle/Triangle/Trapezoid (Enter — все): ").strip() or None
+        limit = input("Не более N последних расчётов (Enter — все): ").strip()
+
+        self.db.flush()
+        if self.reports is None:
+            import reports
+            self.reports = reports.ReportWorker()
+        future = self.reports.submit(self.db, date_from=date_from, date_to=date_to,
+                                     shape_type=shape_type,
+                                     limit=int(limit) if limit.isdigit() else None)
+        future.add_done_callback(self._report_done)
+        print("Отчёт формируется в фоне, можно продолжать работу.")
+        input("\nНажмите Enter...")
+
+    def _report_done(self, future):
+        try:
+            name, count = future.result()
+        except Exception as e:
+            print(f"\nОшибка формирования отчёта: {e}")
+        else:
+            print(f"\nОтчёт сохранён: {name} (строк: {count})")
+
     # ---------------- MAIN LOOP -----------------
 
     def run(self):
-        while True:
-            self.show_menu()
-            c = input("Выберите действие (1-5): ").strip()
-
-            if c == "1": self.calculate_rectangle()
-            elif c == "2": self.calculate_triangle()
-            elif c == "3": self.calculate_trapezoid()
-            elif c == "4": self.show_history()
-            elif c == "5": break
-            else: print("Ошибка выбора!")
+        with self.db:
+            while True:
+                self.show_menu()
+                c = input("Выберите действие (1-6): ").strip()
+
+                if c == "1": self.calculate_rectangle()
+                elif c == "2": self.calculate_triangle()
+                elif c == "3": self.calculate_trapezoid()
+                elif c == "4": self.show_history()
+                elif c == "5": self.export_report()
+                elif c == "6": break
+                else: print("Ошибка выбора!")
+            # Дожидаемся отчётов до закрытия соединений
+            if self.reports is not None:
+                self.reports.shutdown()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Калькулятор геометрических фигур")
+    commands = parser.add_subparsers(dest="command")
+
+    batch = commands.add_parser("batch", help="пакетный расчёт фигур из CSV/JSONL")
+    batch.add_argument("--input", required=True, help="входной файл .csv или .jsonl")
+    batch.add_argument("--output", required=True, help="файл результатов .csv или .jsonl")
+    batch.add_argument("--errors", help="отчёт об ошибочных записях (по умолчанию <output>.errors.jsonl)")
+    batch.add_argument("--save", action="store_true", help="сохранить результаты в БД")
+    batch.add_argument("--chunk-size", type=int, default=10_000, help="строк в порции/транзакции")
+    batch.add_argument("--workers", type=int, default=1, help="число процессов для расчёта")
+
+    serve = commands.add_parser("serve", help="локальный HTTP/JSON-сервис расчётов")
+    serve.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию только localhost)")
+    serve.add_argument("--port", type=int, default=8080, help="порт")
+    serve.add_argument("--workers", type=int, default=1, help="число процессов для расчёта")
+    serve.add_argument("--no-save", action="store_true", help="не сохранять результаты в БД")
+
+    export = commands.add_parser("export", help="выгрузка истории в CSV/JSONL/Parquet")
+    export.add_argument("--output", required=True, help="файл .csv, .jsonl или .parquet")
+    export.add_argument("--format", choices=("csv", "jsonl", "parquet"),
+                        help="формат (по умолчанию по расширению)")
+    export.add_argument("--shape", help="только фигуры этого типа")
+    export.add_argument("--from", dest="date_from", help="с даты ГГГГ-ММ-ДД")
+    export.add_argument("--to", dest="date_to", help="по дату ГГГГ-ММ-ДД включительно")
+    export.add_argument("--batch-size", type=int, default=10_000, help="строк в порции")
+    export.add_argument("--quiet", action="store_true", help="без вывода прогресса")
+
+    retention = commands.add_parser("retention", help="архивирование старой истории")
+    retention.add_argument("--days", type=int, required=True, help="хранить расчеты за N дней")
+    target = retention.add_mutually_exclusive_group(required=True)
+    target.add_argument("--archive", help="файл БД архива")
+    target.add_argument("--delete-only", action="store_true", help="удалить без архивирования")
+    retention.add_argument("--batch-size", type=int, default=10_000, help="строк в порции переноса")
+    retention.add_argument("--chunk-size", type=int, default=1_000,
+                           help="строк в одной транзакции удаления")
+    retention.add_argument("--pause", type=float, default=0.0,
+                           help="пауза между транзакциями удаления, с")
+    retention.add_argument("--vacuum-pages", type=int, default=0,
+                           help="освободить не больше N страниц (0 — все)")
+    retention.add_argument("--full-vacuum", action="store_true",
+                           help="однократно включить auto_vacuum=INCREMENTAL полным VACUUM")
+    return parser
+
+
+def run_batch_command(args):
+    db = DatabaseManager() if args.save else None
+    try:
+        summary = batch_processing.run_batch(args.input, args.output, args.errors,
+                                             db=db, chunk_size=args.chunk_size,
+                                             workers=args.workers)
+    finally:
+        if db is not None:
+            db.close()
+    print(batch_processing.format_summary(summary))
+
+
+def run_serve_command(args):
+    import service
+    db = None if args.no_save else DatabaseManager()
+    try:
+        service.run_service(args.host, args.port, args.workers, db)
+    finally:
+        if db is not None:
+            db.close()
+
+
+def run_export_command(args):
+    import history_export
+    progress = None if args.quiet else history_export.ProgressPrinter()
+    with DatabaseManager() as db:
+        try:
+            count = history_export.export_history(
+                db, args.output, args.format, shape_type=args.shape, date_from=args.date_from,
+                date_to=args.date_to, batch_size=args.batch_size, progress=progress)
+        except (ImportError, ValueError) as e:
+            print(f"Ошибка: {e}")
+            return
+    print(f"Выгружено строк: {count} -> {args.output}")
 
 
-def main():
-    GeometryConsoleApp().run()
+def run_retention_command(args):
+    import retention
+    with DatabaseManager() as db:
+        try:
+            archive = retention.archive_old(db, args.days, args.archive, args.batch_size,
+                                            args.chunk_size, args.pause)
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return
+        maintenance = retention.maintain(db, args.vacuum_pages, args.full_vacuum)
+    print(retention.format_summary(archive, maintenance))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        run_batch_command(args)
+    elif args.command == "serve":
+        run_serve_command(args)
+    elif args.command == "export":
+        run_export_command(args)
+    elif args.command == "retention":
+        run_retention_command(args)
+    else:
+        GeometryConsoleApp().run()
 
 
 if __name__ == "__main__":
@@ -66,6 +66,33 @@ class TestRectangle:
         assert rect1 != rect3
         assert rect1 < rect3
 
+    def test_setter_resets_cache(self):
+        """Тест сброса всех кэшей при изменении размеров"""
+        rect = Rectangle(4, 4)
+        assert rect.inscribed_radius == 2
+        rect.width = 3
+        assert rect.area == 12
+        assert rect.inscribed_radius is None
+        rect.height = 3
+        assert rect.inscribed_radius == 1.5
+
+    def test_rectangle_is_slotted(self):
+        """Тест компактного представления без __dict__"""
+        rect = Rectangle(3, 4)
+        assert not hasattr(rect, "__dict__")
+        assert repr(rect) == "Rectangle(width=3, height=4)"
+
+    def test_rectangle_pickle_and_copy(self):
+        """Тест копий с невычисленным и вычисленным кэшем"""
+        import copy
+        import pickle
+        rect = Rectangle(3, 4)
+        assert pickle.loads(pickle.dumps(rect)).area == 12
+        assert copy.deepcopy(rect).area == 12
+        assert copy.copy(rect).inscribed_radius is None
+        rect.area
+        assert pickle.loads(pickle.dumps(rect)).area == 12
+
 
 class TestTriangle:
     """Тесты для класса Triangle"""
@@ -121,6 +148,17 @@ class TestTriangle:
         assert tri[1] == 4
         assert tri[2] == 5
 
+    def test_triangle_pickle_and_copy(self):
+        """Тест копий треугольника с невычисленным кэшем"""
+        import copy
+        import pickle
+        tri = Triangle(3, 4, 5)
+        restored = pickle.loads(pickle.dumps(tri))
+        assert restored.area == 6
+        assert restored.circumscribed_radius == 2.5
+        assert copy.deepcopy(tri).area == 6
+        assert copy.deepcopy(tri).inscribed_radius == 1.0
+
 
 class TestTrapezoid:
     """Тесты для класса Trapezoid"""
@@ -163,3 +201,1169 @@ class TestTrapezoid:
         """Тест количества сторон"""
         trap = Trapezoid(5, 7, 4)
         assert len(trap) == 4
+
+
+class TestBatch:
+    """Тесты векторизованных расчётов"""
+
+    @pytest.fixture(autouse=True)
+    def numpy(self):
+        return pytest.importorskip("numpy")
+
+    @staticmethod
+    def assert_matches(result, shapes):
+        """Сверка пакетного результата со скалярными классами"""
+        for i, shape in enumerate(shapes):
+            for name in ("area", "circumscribed_radius", "inscribed_radius"):
+                expected = getattr(shape, name)
+                actual = getattr(result, name)[i]
+                if expected is None:
+                    assert math.isnan(actual)
+                else:
+                    assert math.isclose(actual, expected, rel_tol=1e-9)
+
+    def test_rectangles_match_scalar(self):
+        """Тест совпадения с Rectangle, включая квадрат"""
+        from geometry_package import batch
+        params = [(3, 4), (5, 5), (0.1, 7.25)]
+        result = batch.rectangles(*zip(*params))
+        self.assert_matches(result, [Rectangle(*p) for p in params])
+        assert list(result.inscribed_mask) == [False, True, False]
+
+    def test_triangles_match_scalar(self):
+        """Тест совпадения с Triangle"""
+        from geometry_package import batch
+        params = [(3, 4, 5), (5, 5, 5), (2.5, 3.1, 4.7)]
+        result = batch.triangles(*zip(*params))
+        self.assert_matches(result, [Triangle(*p) for p in params])
+
+    def test_trapezoids_match_scalar(self):
+        """Тест совпадения с Trapezoid, включая описанную трапецию"""
+        from geometry_package import batch
+        params = [(5, 7, 4), (2, 8, 4), (7, 5, 1.5)]
+        result = batch.trapezoids(*zip(*params))
+        self.assert_matches(result, [Trapezoid(*p) for p in params])
+        assert result.inscribed_mask[1]
+
+    def test_column_length_mismatch(self):
+        """Тест проверки длины столбцов"""
+        from geometry_package import batch
+        with pytest.raises(ValueError, match="одинаковую длину"):
+            batch.rectangles([1, 2], [3])
+
+    def test_validators_reason_codes(self):
+        """Тест маски и кодов причин без исключений"""
+        from geometry_package import batch
+        result = batch.validate_triangles([3, 1, -1, float("nan")], [4, 1, 2, 1], [5, 3, 2, 1])
+        assert list(result.mask) == [True, False, False, False]
+        assert list(result.reasons) == [batch.VALID, batch.TRIANGLE_INEQUALITY,
+                                        batch.NON_POSITIVE, batch.NOT_FINITE]
+        errors = dict(result.errors())
+        with pytest.raises(ValueError) as scalar:
+            Triangle(1, 1, 3)
+        assert errors[1] == str(scalar.value)
+        assert list(batch.validate_trapezoids([1, 2], [1, 2], [0, 1]).mask) == [False, True]
+
+    def test_calculate_valid_subset(self):
+        """Тест расчёта только корректных строк"""
+        from geometry_package import batch
+        validation, result = batch.calculate_valid("Rectangle", [3, -3, 2], [4, 4, 2])
+        assert list(validation.invalid_indices) == [1]
+        assert list(result.area[[0, 2]]) == [12, 4]
+        assert math.isnan(result.area[1]) and math.isnan(result.circumscribed_radius[1])
+
+    def test_batch_processing_vectorized_matches_scalar(self, monkeypatch):
+        """Тест векторизованного compute_chunk против поштучного"""
+        import batch_processing
+        chunk = [(i, {"shape": "Triangle", "a": 3, "b": 4, "c": 5 + i % 5}) for i in range(100)]
+        chunk += [(i, {"shape": "Trapezoid", "base1": 2, "base2": 8, "height": i % 3})
+                  for i in range(100)]
+        codes, params, _, _ = batch_processing.encode_chunk(chunk)
+        metrics, failed = batch_processing.compute_chunk(codes, params)
+        monkeypatch.setattr(batch_processing, "VECTORIZE_MIN_ROWS", 10 ** 9)
+        expected_metrics, expected_failed = batch_processing.compute_chunk(codes, params)
+        assert failed == expected_failed and len(failed) == 60 + 34
+        for actual, expected in zip(metrics, expected_metrics):
+            assert (math.isnan(actual) and math.isnan(expected)) or \
+                math.isclose(actual, expected, rel_tol=1e-12)
+
+
+class TestShapeArray:
+    """Тесты колоночного хранилища фигур"""
+
+    @pytest.fixture(autouse=True)
+    def numpy(self):
+        return pytest.importorskip("numpy")
+
+    def test_view_matches_shape(self):
+        """Тест совпадения представления с объектом фигуры"""
+        from geometry_package.shape_array import TriangleArray
+        shapes = [Triangle(3, 4, 5), Triangle(5, 5, 5)]
+        arr = TriangleArray.from_shapes(shapes)
+        view = arr[-1]
+        assert len(arr) == 2
+        assert view == shapes[1]
+        assert view.a == 5
+        assert math.isclose(view.inscribed_radius, shapes[1].inscribed_radius, rel_tol=1e-9)
+        assert view.to_shape().sides == (5, 5, 5)
+
+    def test_missing_inscribed_radius_is_none(self):
+        """Тест отсутствующей вписанной окружности"""
+        from geometry_package.shape_array import RectangleArray
+        arr = RectangleArray([3, 4], [4, 4])
+        assert arr[0].inscribed_radius is None
+        assert arr[1].inscribed_radius == 2
+
+    def test_slice_mask_concatenate(self, numpy):
+        """Тест срезов, фильтрации маской и объединения"""
+        from geometry_package.shape_array import TrapezoidArray
+        arr = TrapezoidArray([5, 2, 7], [7, 8, 5], [4, 4, 1.5])
+        big = arr[arr.area > 10]
+        assert len(big) == 2
+        assert list(big.column("base1")) == [5, 2]
+        assert len(arr[1:]) == 2
+        joined = TrapezoidArray.concatenate([arr[:1], big])
+        assert list(joined.area) == [24, 24, 20]
+
+    def test_view_saved_as_shape_row(self, tmp_path):
+        """Тест: строка массива сохраняется в БД под типом фигуры"""
+        from database import shape_to_row
+        from geometry_package import MetricsCache
+        from geometry_package.shape_array import RectangleArray
+        from interface import DatabaseManager
+        view = RectangleArray([3], [4])[0]
+        assert view.shape_type == "Rectangle"
+        assert shape_to_row(view) == shape_to_row(Rectangle(3.0, 4.0))
+        assert MetricsCache(4).metrics(view) == (12.0, 2.5, None)
+        with DatabaseManager(str(tmp_path / "views.db")) as db:
+            db.save_shape(view)
+            assert db.get_history()[0][1:3] == ("Rectangle", "ширина=3.0, высота=4.0")
+
+    def test_unpickled_in_fresh_process(self, tmp_path):
+        """Тест: массив, восстановленный в новом процессе, работает без __init__"""
+        import os
+        import pickle
+        import subprocess
+        import sys
+        from geometry_package.shape_array import TriangleArray
+        path = tmp_path / "arr.pickle"
+        path.write_bytes(pickle.dumps(TriangleArray([3, 5], [4, 5], [5, 5])))
+        code = ("import pickle, sys\n"
+                f"arr = pickle.loads(open({str(path)!r}, 'rb').read())\n"
+                "print(arr[0].area, len(arr[[True, False]]))\n")
+        out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        assert out.split() == ["6.0", "1"]
+
+    def test_concatenate_rejects_other_types(self):
+        """Тест запрета объединения разных типов"""
+        from geometry_package.shape_array import RectangleArray, TriangleArray
+        with pytest.raises(TypeError):
+            RectangleArray.concatenate([RectangleArray([1], [2]), TriangleArray([3], [4], [5])])
+
+
+class TestDatabase:
+    """Тесты менеджера базы данных"""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        from interface import DatabaseManager
+        with DatabaseManager(str(tmp_path / "test.db")) as manager:
+            yield manager
+
+    def test_save_and_history(self, db):
+        """Тест сохранения и чтения истории"""
+        row_id = db.save_calculation("Rectangle", "ширина=3, высота=4", 12, 2.5, None)
+        history = db.get_history()
+        assert len(history) == 1
+        assert history[0][:6] == (row_id, "Rectangle", "ширина=3, высота=4", 12, 2.5, None)
+
+    def test_connection_is_reused(self, db):
+        """Тест повторного использования соединения"""
+        assert db._connect() is db._connect()
+
+    def test_pragmas_applied(self, tmp_path):
+        """Тест настройки соединения через pragmas"""
+        from interface import DatabaseManager
+        with DatabaseManager(str(tmp_path / "test.db"), pragmas={'cache_size': -1000}) as db:
+            conn = db._connect()
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -1000
+
+    def test_close_and_reconnect(self, db):
+        """Тест закрытия соединений и повторного подключения"""
+        conn = db._connect()
+        db.close()
+        with pytest.raises(Exception):
+            conn.execute("SELECT 1")
+        assert db.get_history() == []
+
+    def test_thread_connection_closed_on_exit(self, db):
+        """Тест: соединение завершившегося потока закрывается, а не копится"""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(db._connect()))
+        thread.start()
+        thread.join()
+        with pytest.raises(Exception):
+            connections[0].execute("SELECT 1")
+        barrier = threading.Barrier(2)
+
+        def work(_):
+            db.get_statistics()
+            barrier.wait()
+
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(work, range(2)))
+            assert len(db._connections) == 3
+        assert len(db._connections) == 1
+        assert db.get_statistics()['total'] == 0
+
+    def test_validate_missing_table(self, tmp_path):
+        """Тест проверки существующей БД без таблицы"""
+        import database
+        with pytest.raises(ValueError, match="calculations"):
+            database.DatabaseManager(str(tmp_path / "empty.db"))
+
+    def test_shape_to_row_matches_console_format(self):
+        """Тест формата параметров, как в консольном приложении"""
+        import database
+        assert database.shape_to_row(Rectangle(3.0, 4.0))[:2] == ("Rectangle", "ширина=3.0, высота=4.0")
+        assert database.shape_to_row(Triangle(3, 4, 5)) == ("Triangle", "3,4,5", 6.0, 2.5, 1.0)
+        assert database.shape_to_row(Trapezoid(5, 7, 4))[1] == "5,7, h=4"
+
+    def test_save_calculations_chunks(self, db):
+        """Тест пакетного сохранения генератора фигур порциями"""
+        shapes = (Rectangle(i, 2) for i in range(1, 8))
+        ids = db.save_calculations(shapes, chunk_size=3)
+        assert len(ids) == 7
+        rows = db.get_history()
+        assert sorted(r[0] for r in rows) == list(ids)
+        assert {r[2] for r in rows} == {f"ширина={i}, высота=2" for i in range(1, 8)}
+
+    def test_save_calculations_interleaved_writer(self, db):
+        """Тест: строки другого соединения между порциями не попадают в результат"""
+        from interface import DatabaseManager
+        other = DatabaseManager(db.db_name)
+
+        def shapes():
+            for i in range(1, 8):
+                if i == 4:
+                    other.save_shape(Triangle(3, 4, 5))
+                yield Rectangle(i, 2)
+
+        ids = db.save_calculations(shapes(), chunk_size=3)
+        other.close()
+        assert list(ids) == [1, 2, 3, 5, 6, 7, 8]
+        assert ids == [1, 2, 3, 5, 6, 7, 8] and ids[3] == 5 and ids[-1] == 8
+        assert 4 not in ids and len(ids.ranges) == 2
+        assert all(r[1] == "Rectangle" for r in db.get_history() if r[0] in ids)
+
+    def test_save_calculations_accepts_tuples(self, db):
+        """Тест пакетного сохранения готовых кортежей"""
+        ids = db.save_calculations([("Triangle", "3,4,5", 6.0, 2.5, 1.0)])
+        assert db.get_history()[0][0] == ids[0]
+        assert len(db.save_calculations([])) == 0
+
+    def test_write_behind_flush(self, tmp_path):
+        """Тест отложенной записи с явным flush"""
+        from interface import DatabaseManager
+        with DatabaseManager(str(tmp_path / "test.db"), write_behind=True,
+                             flush_size=2, flush_interval=60) as db:
+            assert db.save_calculation("Triangle", "3,4,5", 6.0, 2.5, 1.0) is None
+            db.flush()
+            assert len(db.get_history()) == 1
+
+    def test_write_behind_close_keeps_pending(self, tmp_path):
+        """Тест сохранения очереди при закрытии менеджера"""
+        from interface import DatabaseManager
+        path = str(tmp_path / "test.db")
+        db = DatabaseManager(path, write_behind=True, flush_interval=60)
+        for i in range(1, 6):
+            db.save_shape(Rectangle(i, 1))
+        db.close()
+        with DatabaseManager(path) as reader:
+            assert len(reader.get_history()) == 5
+
+    def test_migrations_create_indexes(self, db):
+        """Тест индексов, созданных миграциями"""
+        import database
+        conn = db._connect()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM calculations "
+                            "WHERE shape_type = ? ORDER BY timestamp DESC LIMIT 5",
+                            ("Triangle",)).fetchall()
+        assert "idx_calculations_shape_timestamp" in str(plan)
+
+    def test_history_pages(self, db):
+        """Тест keyset-пагинации вперёд и назад"""
+        ids = list(db.save_calculations(Rectangle(i, 1) for i in range(1, 8)))
+        first = db.get_history_page(page_size=3)
+        assert [r[0] for r in first] == ids[:-4:-1]
+        older = db.get_history_page(before_id=first[-1][0], page_size=3)
+        assert [r[0] for r in older] == ids[3:0:-1]
+        newer = db.get_history_page(after_id=older[0][0], page_size=3)
+        assert newer == first
+
+    def test_iter_history(self, db):
+        """Тест прохода по всей истории страницами"""
+        ids = list(db.save_calculations(Rectangle(i, 1) for i in range(1, 8)))
+        assert [r[0] for r in db.iter_history(page_size=2)] == ids
+        assert [r[0] for r in db.iter_history(after_id=ids[4], page_size=2)] == ids[5:]
+
+    def test_parse_parameters(self):
+        """Тест разбора строк параметров всех форматов"""
+        import database
+        assert database.parse_parameters("Rectangle", "ширина=3.0, высота=4.5") == (3.0, 4.5)
+        assert database.parse_parameters("Triangle", "3,4,5") == (3.0, 4.0, 5.0)
+        assert database.parse_parameters("Trapezoid", "1.5,2, h=1e-05") == (1.5, 2.0, 1e-05)
+        assert database.parse_parameters("Triangle", "3,4") is None
+
+    def test_find_calculations_by_range(self, db):
+        """Тест поиска треугольников по диапазону стороны"""
+        db.save_calculations([Triangle(3, 4, 5), Triangle(5, 5, 5), Triangle(7, 8, 9)])
+        db.save_calculation("Triangle", "4,4,4", 6.9, 2.3, 1.1)
+        rows = db.find_calculations("Triangle", a=(4, 7))
+        assert sorted(r[2] for r in rows) == ["4,4,4", "5,5,5", "7,8,9"]
+        assert len(db.find_calculations("Triangle", a=(None, 4), c=(5, None))) == 1
+        with pytest.raises(ValueError):
+            db.find_calculations("Triangle", width=(1, 2))
+
+    def test_parameter_columns_backfill(self, tmp_path):
+        """Тест заполнения числовых столбцов для старой базы"""
+        import sqlite3
+        from interface import DatabaseManager
+        path = str(tmp_path / "old.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("""
+                CREATE TABLE calculations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, shape_type TEXT NOT NULL,
+                    parameters TEXT NOT NULL, area REAL NOT NULL,
+                    circumscribed_radius REAL, inscribed_radius REAL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)
+            """)
+            conn.execute("INSERT INTO calculations (shape_type, parameters, area) "
+                         "VALUES ('Trapezoid', '5.0,7.0, h=4.0', 24)")
+        conn.close()
+        with DatabaseManager(path) as db:
+            row = db._connect().execute(
+                "SELECT param1, param2, param3 FROM calculations").fetchone()
+            assert row == (5.0, 7.0, 4.0)
+            assert len(db.find_calculations("Trapezoid", height=(4, 4))) == 1
+
+    def test_statistics_follow_inserts_and_deletes(self, db):
+        """Тест сводной статистики при вставке и удалении"""
+        db.save_calculations([Rectangle(1, 2), Rectangle(3, 4), Triangle(3, 4, 5)])
+        stats = db.get_statistics()
+        assert stats['total'] == 3
+        assert stats['by_shape'] == [("Rectangle", 2, 7.0, 2.0, 12.0), ("Triangle", 1, 6.0, 6.0, 6.0)]
+        assert stats['last_calculation'] is not None
+
+        with db._connect() as conn:
+            conn.execute("DELETE FROM calculations WHERE area = 2")
+            conn.execute("DELETE FROM calculations WHERE shape_type = 'Triangle'")
+        assert db.get_statistics()['by_shape'] == [("Rectangle", 1, 12.0, 12.0, 12.0)]
+        assert db.verify_statistics() == []
+
+    def test_clear_history_resets_statistics(self, db):
+        """Тест сброса статистики при очистке истории"""
+        db.save_calculations([Rectangle(1, 2), Triangle(3, 4, 5)])
+        assert db.clear_history(confirm=True) == 2
+        assert db.get_statistics() == {'total': 0, 'by_shape': [], 'last_calculation': None}
+        db.save_shape(Rectangle(2, 2))
+        assert db.get_statistics()['total'] == 1
+
+    def test_verify_statistics_reports_drift(self, db):
+        """Тест обнаружения и исправления расхождений статистики"""
+        db.save_calculations([Rectangle(1, 2), Rectangle(3, 4)])
+        with db._connect() as conn:
+            conn.execute("UPDATE calculation_stats SET count = 5")
+        drift = db.verify_statistics(repair=True)
+        assert drift == [{'shape_type': "Rectangle", 'field': 'count', 'expected': 2, 'actual': 5}]
+        assert db.verify_statistics() == []
+
+    def test_lookup_and_unique_save(self, db):
+        """Тест поиска сохранённого расчета и сохранения без дубликатов"""
+        row_id = db.save_shape(Triangle(3, 4, 5))
+        assert db.lookup_calculation("Triangle", (5, 3, 4)) == (row_id, 6.0, 2.5, 1.0)
+        assert db.lookup_calculation("Triangle", (5, 5, 5)) is None
+
+        assert db.save_shape_unique(Triangle(4, 5, 3)) == (row_id, False)
+        assert db.save_shape_unique(Triangle(4, 5, 3), keep_timestamps=False) == (row_id, False)
+        new_id, created = db.save_shape_unique(Rectangle(2, 2))
+        assert created and new_id != row_id
+        conn = db._connect()
+        assert conn.execute("SELECT COUNT(*) FROM calculations").fetchone()[0] == 2
+        assert conn.execute("SELECT calculation_id FROM calculation_requests").fetchall() == [(row_id,)]
+
+    def test_compact_duplicates(self, db):
+        """Тест сжатия истории с повторяющимися фигурами"""
+        ids = db.save_calculations([Rectangle(3, 4), Rectangle(4, 3), Triangle(3, 4, 5), Rectangle(3, 4)])
+        assert db.compact_duplicates() == 2
+        conn = db._connect()
+        assert [r[0] for r in conn.execute("SELECT id FROM calculations ORDER BY id")] == [ids[0], ids[2]]
+        assert conn.execute("SELECT COUNT(*) FROM calculation_requests "
+                            "WHERE calculation_id = ?", (ids[0],)).fetchone()[0] == 2
+        assert db.get_statistics()['total'] == 2
+        assert db.clear_history(confirm=True) == 2
+        assert conn.execute("SELECT COUNT(*) FROM calculation_requests").fetchone()[0] == 0
+
+
+class TestDistribution:
+    """Тесты потоковых распределений"""
+
+    def test_sketch_quantiles_bounded_memory(self):
+        """Тест точности квантилей и ограниченного размера скетча"""
+        from distribution import KLLSketch
+        sketch = KLLSketch(k=200, seed=1)
+        for i in range(100_000):
+            sketch.update(i % 1000)
+        assert sum(len(c) for c in sketch.compactors) < 1000
+        p50, p99 = sketch.quantiles([0.5, 0.99])
+        assert abs(p50 - 500) < 30
+        assert abs(p99 - 990) < 30
+        assert sum(c for _, _, c in sketch.histogram(10)) == 100_000
+
+    def test_sketch_merge(self):
+        """Тест объединения скетчей"""
+        from distribution import KLLSketch
+        left, right = KLLSketch(seed=1), KLLSketch(seed=2)
+        for i in range(5000):
+            left.update(i)
+            right.update(5000 + i)
+        left.merge(KLLSketch.from_dict(right.to_dict()))
+        assert left.count == 10_000
+        assert (left.min, left.max) == (0, 9999)
+        assert abs(left.quantile(0.5) - 5000) < 300
+
+    def test_update_from_databases(self, tmp_path):
+        """Тест инкрементального обновления и объединения нескольких БД"""
+        from interface import DatabaseManager
+        from distribution import DistributionStats
+        paths = [str(tmp_path / "a.db"), str(tmp_path / "b.db")]
+        for path, sizes in zip(paths, ([1, 2, 3], [4, 5])):
+            with DatabaseManager(path) as db:
+                db.save_calculations(Rectangle(s, s) for s in sizes)
+
+        stats = DistributionStats()
+        with DatabaseManager(paths[0]) as db:
+            assert stats.update_from(db, batch_size=2) == 3
+            db.save_shape(Rectangle(6, 6))
+            assert stats.update_from(db) == 1
+
+        stats.merge(DistributionStats.from_databases(paths[1:]))
+        area = stats.summary()["Rectangle"]["area"]
+        assert area["count"] == 6
+        assert (area["min"], area["max"], area["p50"]) == (1.0, 36.0, 9.0)
+        assert stats.summary()["Rectangle"]["inscribed_radius"]["count"] == 6
+
+
+class TestBatchProcessing:
+    """Тесты пакетного режима"""
+
+    def test_csv_to_jsonl_with_errors(self, tmp_path):
+        """Тест расчёта CSV с отчётом об ошибочных строках"""
+        import json
+        from batch_processing import run_batch
+        source = tmp_path / "shapes.csv"
+        source.write_text("shape,width,height,a,b,c\n"
+                          "Rectangle,3,4,,,\n"
+                          "Triangle,,,1,1,3\n"
+                          "Circle,,,,,\n"
+                          "Triangle,,,3,4,5\n", encoding="utf-8")
+        output = tmp_path / "results.jsonl"
+        summary = run_batch(str(source), str(output), chunk_size=2)
+
+        assert (summary['rows'], summary['ok'], summary['errors']) == (4, 2, 2)
+        results = [json.loads(l) for l in output.read_text(encoding="utf-8").splitlines()]
+        assert [r['line'] for r in results] == [2, 5]
+        assert results[1]['area'] == 6.0
+        errors = [json.loads(l) for l in open(summary['errors_path'], encoding="utf-8")]
+        assert [e['line'] for e in errors] == [3, 4]
+        assert "не существует" in errors[0]['error']
+
+    def test_cli_jsonl_to_csv_saves_to_db(self, tmp_path, monkeypatch, capsys):
+        """Тест команды batch с сохранением в БД"""
+        import interface
+        monkeypatch.setenv("DB_PATH", str(tmp_path / "cli.db"))
+        source = tmp_path / "shapes.jsonl"
+        source.write_text('{"shape": "Trapezoid", "base1": 5, "base2": 7, "height": 4}\n'
+                          '{"shape": "Rectangle", "width": 2, "height": 2}\n', encoding="utf-8")
+        output = tmp_path / "results.csv"
+        interface.main(["batch", "--input", str(source), "--output", str(output), "--save"])
+
+        assert "успешно: 2" in capsys.readouterr().out
+        assert output.read_text(encoding="utf-8").splitlines()[1].startswith("1,Trapezoid,")
+        with interface.DatabaseManager() as db:
+            assert db.get_statistics()['total'] == 2
+
+    def test_jsonl_malformed_lines(self, tmp_path):
+        """Тест: битая строка, не-объект JSON и нестроковый тип попадают в отчёт, запуск продолжается"""
+        import json
+        from batch_processing import run_batch
+        source = tmp_path / "shapes.jsonl"
+        source.write_text('{"shape": "Rectangle", "width": 3, "height": 4}\n'
+                          '{"shape": "Triangle", "a": 3,\n'
+                          '[1, 2]\n'
+                          '\n'
+                          '{"shape": ["Triangle"], "a": 1}\n'
+                          '{"shape": {"x": 1}}\n'
+                          '{"shape": "Triangle", "a": 3, "b": 4, "c": 5}\n', encoding="utf-8")
+        output = tmp_path / "results.jsonl"
+        summary = run_batch(str(source), str(output))
+
+        assert (summary['rows'], summary['ok'], summary['errors']) == (6, 2, 4)
+        results = [json.loads(l) for l in output.read_text(encoding="utf-8").splitlines()]
+        assert [r['line'] for r in results] == [1, 7]
+        errors = [json.loads(l) for l in open(summary['errors_path'], encoding="utf-8")]
+        assert [e['line'] for e in errors] == [2, 3, 5, 6]
+        assert errors[0]['error'].startswith("Некорректный JSON")
+        assert errors[0]['record'] == '{"shape": "Triangle", "a": 3,'
+        assert errors[1]['error'] == "Запись должна быть объектом JSON"
+        assert errors[1]['record'] == [1, 2]
+        assert errors[2]['error'] == "Неизвестный тип фигуры: ['Triangle']"
+        assert errors[3]['error'] == "Неизвестный тип фигуры: {'x': 1}"
+
+    def test_parallel_matches_serial(self, tmp_path):
+        """Тест параллельного режима: тот же результат в порядке входа"""
+        from batch_processing import run_batch
+        source = tmp_path / "shapes.csv"
+        lines = ["shape,width,height,a,b,c,base1,base2"]
+        for i in range(1, 60):
+            lines.append(f"Rectangle,{i},{i % 7 + 1},,,,,")
+            lines.append(f"Triangle,,,{i},{i},{i if i % 10 else 3 * i},,")
+            lines.append(f"Trapezoid,,{i % 5 + 1},,,,{i},{i + 2}")
+        source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        serial = run_batch(str(source), str(tmp_path / "serial.jsonl"), chunk_size=16)
+        parallel = run_batch(str(source), str(tmp_path / "parallel.jsonl"),
+                             chunk_size=16, workers=2)
+        assert serial['errors'] == parallel['errors'] == 5
+        assert ((tmp_path / "serial.jsonl").read_text(encoding="utf-8")
+                == (tmp_path / "parallel.jsonl").read_text(encoding="utf-8"))
+        assert (open(serial['errors_path'], encoding="utf-8").read()
+                == open(parallel['errors_path'], encoding="utf-8").read())
+
+
+class TestMetricsCache:
+    """Тесты кэша характеристик"""
+
+    def test_triangle_permutations_share_entry(self):
+        """Тест общего ключа для перестановок сторон"""
+        from geometry_package import MetricsCache
+        cache = MetricsCache(maxsize=10)
+        first = cache.create(Triangle, 3, 4, 5)
+        second = cache.create(Triangle, 5, 3, 4)
+        assert second.area == first.area == 6
+        assert second.inscribed_radius == 1.0
+        assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+
+    def test_cached_none_metric(self):
+        """Тест кэширования отсутствующей вписанной окружности"""
+        from geometry_package import MetricsCache
+        cache = MetricsCache()
+        cache.create(Rectangle, 3, 4)
+        assert cache.create(Rectangle, 4, 3).inscribed_radius is None
+        assert cache.stats()['hit_rate'] == 0.5
+
+    def test_lru_eviction(self):
+        """Тест вытеснения давно не использованных записей"""
+        from geometry_package import MetricsCache
+        cache = MetricsCache(maxsize=2)
+        cache.create(Rectangle, 1, 1)
+        cache.create(Rectangle, 2, 2)
+        cache.create(Rectangle, 1, 1)
+        cache.create(Rectangle, 3, 3)
+        assert cache.evictions == 1
+        cache.create(Rectangle, 1, 1)
+        assert cache.stats()['hits'] == 2
+
+
+class TestReports:
+    """Тесты сводного отчёта Word"""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        pytest.importorskip("docx")
+        from interface import DatabaseManager
+        with DatabaseManager(str(tmp_path / "reports.db")) as db:
+            db.save_calculations([Rectangle(3, 4), Triangle(3, 4, 5), Rectangle(1, 1),
+                                  Trapezoid(5, 7, 4)])
+            db._connect().execute("UPDATE calculations SET timestamp = '2024-01-0' || id || ' 12:00:00'")
+            db._connect().commit()
+            yield db
+
+    def test_filtered_report(self, db, tmp_path):
+        """Тест фильтров, сводной статистики и строк таблицы"""
+        from docx import Document
+        from reports import export_history_report
+        path, count = export_history_report(db, str(tmp_path / "r.docx"),
+                                            date_from="2024-01-01", date_to="2024-01-03",
+                                            shape_type="Rectangle")
+        assert count == 2
+        stats, history = Document(path).tables
+        assert [c.text for c in stats.rows[1].cells][:2] == ["Rectangle", "2"]
+        assert len(history.rows) == 3
+        assert [r.cells[0].text for r in history.rows[1:]] == ["3", "1"]
+        assert [c.text for c in history.rows[2].cells[3:6]] == ["12.0000", "2.5000", "нет"]
+
+    def test_background_limit(self, db, tmp_path):
+        """Тест построения в фоне с ограничением числа строк"""
+        from docx import Document
+        from reports import ReportWorker
+        worker = ReportWorker()
+        future = worker.submit(db, path=str(tmp_path / "r.docx"), limit=3)
+        worker.shutdown()
+        path, count = future.result()
+        assert count == 3
+        assert Document(path).tables[1].rows[-1].cells[1].text == "Triangle"
+
+
+class TestStartup:
+    """Тесты времени запуска"""
+
+    def test_optional_dependencies_not_loaded(self):
+        """Тест: импорт интерфейса не загружает python-docx, numpy и multiprocessing"""
+        from benchmarks.bench_startup import LAZY_MODULES, import_profile
+        _, modules = import_profile('interface')
+        assert 'batch_processing' in modules
+        assert [m for m in LAZY_MODULES if m in modules] == []
+
+    def test_numpy_loaded_on_first_use(self):
+        """Тест ленивой загрузки numpy пакетными расчётами"""
+        pytest.importorskip("numpy")
+        from geometry_package import batch
+        assert batch.NUMPY_AVAILABLE
+        result = batch.rectangles([3.0], [4.0])
+        assert batch.np is not None
+        assert result.area[0] == 12.0
+
+
+class TestBenchmarks:
+    """Тесты набора бенчмарков"""
+
+    def test_shapes_before_after(self):
+        """Тест сравнения с исходными классами: те же характеристики, меньше памяти"""
+        from benchmarks import legacy_shapes
+        from benchmarks.bench_shapes import compare
+        old, new = legacy_shapes.Trapezoid(5, 7, 4), Trapezoid(5, 7, 4)
+        assert (old.area, old.circumscribed_radius, old.inscribed_radius) == \
+               (new.area, new.circumscribed_radius, new.inscribed_radius)
+        for result in compare(500).values():
+            assert result['after'][0] < result['before'][0]
+
+    def test_synthetic_database_reused(self, tmp_path):
+        """Тест построения и повторного использования синтетической БД"""
+        from benchmarks.run import synthetic_database
+        from interface import DatabaseManager
+        path = str(tmp_path / "synthetic.db")
+        synthetic_database(path, 300)
+        synthetic_database(path, 300)
+        with DatabaseManager(path) as db:
+            stats = db.get_statistics()
+        assert stats['total'] == 300
+        assert [row[1] for row in stats['by_shape']] == [100, 100, 100]
+
+    def test_compare_marks_regressions(self):
+        """Тест сравнения с базовыми результатами"""
+        from benchmarks.run import compare
+        baseline = {'results': {'a': {'seconds': 1.0}, 'b': {'seconds': 1.0}}}
+        current = {'results': {'a': {'seconds': 1.1}, 'b': {'seconds': 1.5},
+                               'new': {'seconds': 1.0}}}
+        rows = compare(current, baseline, threshold=0.2)
+        assert [(name, slower) for name, *_, slower in rows] == [('a', False), ('b', True)]
+
+
+class TestInstrumentation:
+    """Тесты инструментации"""
+
+    def test_disabled_leaves_functions_untouched(self):
+        """Тест: без GEOMETRY_METRICS обёртки не создаются"""
+        from geometry_package import instrumentation
+        from geometry_package.rectangle import Rectangle as Rect
+        if instrumentation.ENABLED:
+            pytest.skip("инструментация включена в окружении")
+        fn = lambda: None
+        assert instrumentation.timed("x")(fn) is fn
+        assert Rect.area.fget.__qualname__ == "Rectangle.area"
+
+    def test_generator_timed_over_iteration(self, monkeypatch):
+        """Тест: у генератора замеряются все шаги прохода, а не создание"""
+        import time
+        from geometry_package import instrumentation
+        monkeypatch.setattr(instrumentation, "ENABLED", True)
+        monkeypatch.setattr(instrumentation, "REGISTRY", instrumentation.Registry())
+
+        @instrumentation.timed("gen")
+        def numbers(count):
+            for i in range(count):
+                time.sleep(0.01)
+                yield i
+
+        iterator = numbers(3)
+        assert instrumentation.REGISTRY.snapshot() == {}
+        for _ in iterator:
+            time.sleep(0.05)
+        taken = numbers(5)
+        next(taken)
+        taken.close()
+        metrics = instrumentation.REGISTRY.snapshot()["gen"]
+        assert metrics["count"] == 2 and metrics["errors"] == 0
+        assert 0.04 <= metrics["sum"] < 0.15
+
+    def test_enabled_dump_json(self, tmp_path):
+        """Тест счётчиков форм, БД и ошибок в снимке JSON"""
+        import json
+        import os
+        import subprocess
+        import sys
+        path = tmp_path / "metrics.json"
+        code = (
+            "from geometry_package import instrumentation\n"
+            "from geometry_package.triangle import Triangle\n"
+            "from interface import DatabaseManager\n"
+            f"db = DatabaseManager({str(tmp_path / 'm.db')!r})\n"
+            "db.save_shape(Triangle(3, 4, 5))\n"
+            "try:\n    db.find_calculations('Circle')\nexcept ValueError:\n    pass\n"
+            "db.close()\n"
+            "instrumentation.dump()\n"
+        )
+        env = dict(os.environ, GEOMETRY_METRICS="1", GEOMETRY_METRICS_FILE=str(path))
+        subprocess.run([sys.executable, "-c", code], check=True, env=env,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        metrics = json.loads(path.read_text(encoding="utf-8"))["metrics"]
+        assert metrics["db.save_shape"]["count"] == 1
+        assert metrics["shape.Triangle.area"]["count"] >= 1
+        assert sum(metrics["db.save_calculation"]["buckets"].values()) == 1
+        assert metrics["db.find_calculations"]["errors"] == 1
+
+
+class TestAreaIndex:
+    """Тесты выборок по площади"""
+
+    @pytest.fixture
+    def shapes(self):
+        import random
+        rnd = random.Random(3)
+        shapes = [Rectangle(rnd.randint(1, 20), rnd.randint(1, 20)) for _ in range(500)]
+        return shapes + [Triangle(3, 4, 5), Trapezoid(1, 2, 4)]
+
+    def test_same_order_as_sort(self, shapes):
+        """Тест совпадения порядка с sorted() при равных площадях"""
+        from geometry_package import AreaIndex
+        from geometry_package.area_index import nlargest, nsmallest
+        index = AreaIndex(shapes[:100])
+        for shape in shapes[100:]:
+            index.add(shape)
+        assert [id(s) for s in index] == [id(s) for s in sorted(shapes)]
+        expected = sorted(shapes, reverse=True)[:25]
+        assert [id(s) for s in index.top_k(25)] == [id(s) for s in expected]
+        assert [id(s) for s in nlargest(shapes, 25)] == [id(s) for s in expected]
+        assert [id(s) for s in nsmallest(shapes, 7)] == [id(s) for s in index.top_k(7, largest=False)]
+
+    def test_range_and_equal_use_tolerance(self, shapes):
+        """Тест диапазона и равенства с допуском isclose"""
+        from geometry_package import AreaIndex
+        index = AreaIndex(shapes)
+        assert index.range(10, 20) == [s for s in sorted(shapes) if 10 <= s.area <= 20]
+        close = Rectangle(2, 3 * (1 + 1e-12))
+        index.add(close)
+        assert close in index.range(6, 6)
+        assert set(map(id, index.equal(Triangle(3, 4, 5)))) == \
+            {id(s) for s in shapes + [close] if s == Triangle(3, 4, 5)}
+
+    def test_nearest(self):
+        """Тест поиска ближайших по площади"""
+        from geometry_package import AreaIndex
+        index = AreaIndex([Rectangle(1, 1), Rectangle(2, 5), Rectangle(3, 4), Rectangle(5, 5)])
+        assert index.nearest(11)[0].area == 10
+        assert [s.area for s in index.nearest(Triangle(3, 4, 5), k=3)] == [10, 1, 12]
+        assert [s.area for s in index.nearest(100, k=10)] == [25, 12, 10, 1]
+
+
+class TestService:
+    """Тесты HTTP-сервиса расчётов"""
+
+    @staticmethod
+    async def _request(port, method, path, payload=None):
+        import asyncio
+        import json
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = b"" if payload is None else json.dumps(payload).encode()
+        writer.write(f"{method} {path} HTTP/1.1\r\nConnection: close\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        response = await reader.read()
+        writer.close()
+        head, _, data = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(data)
+
+    def test_calculate_and_persist(self, tmp_path):
+        """Тест одной фигуры, пакета, ошибок и сохранения в БД"""
+        import asyncio
+        from interface import DatabaseManager
+        from service import CalculationService
+        db = DatabaseManager(str(tmp_path / "service.db"))
+
+        async def scenario():
+            service = CalculationService(db)
+            port = await service.start(port=0)
+            try:
+                single = await self._request(port, "POST", "/calculate",
+                                             {"shape": "Triangle", "a": 3, "b": 4, "c": 5})
+                invalid = await self._request(port, "POST", "/calculate",
+                                              {"shape": "Triangle", "a": 1, "b": 1, "c": 3})
+                batch = await self._request(port, "POST", "/calculate", {"shapes": [
+                    {"shape": "Rectangle", "width": 2, "height": 2}, {"shape": "Circle"},
+                    {"shape": ["Triangle"], "a": 1}]})
+                missing = await self._request(port, "GET", "/nothing")
+            finally:
+                await service.stop()
+            return single, invalid, batch, missing
+
+        single, invalid, batch, missing = asyncio.run(scenario())
+        assert single == (200, {"shape": "Triangle", "parameters": "3.0,4.0,5.0", "area": 6.0,
+                                "circumscribed_radius": 2.5, "inscribed_radius": 1.0})
+        assert invalid[0] == 400 and "не существует" in invalid[1]["error"]
+        assert batch[0] == 200
+        assert batch[1]["results"][0]["inscribed_radius"] == 1.0
+        assert "Неизвестный тип" in batch[1]["results"][1]["error"]
+        assert "Неизвестный тип" in batch[1]["results"][2]["error"]
+        assert missing[0] == 404
+        assert db.get_statistics()["total"] == 2
+        db.close()
+
+    def test_load_test_keep_alive(self):
+        """Тест нагрузочного клиента на соединениях keep-alive"""
+        import asyncio
+        from benchmarks.bench_service import load_test
+        from service import CalculationService
+
+        async def scenario():
+            service = CalculationService()
+            port = await service.start(port=0)
+            try:
+                return await load_test("127.0.0.1", port, requests=60, concurrency=4, batch=3)
+            finally:
+                await service.stop()
+
+        result = asyncio.run(scenario())
+        assert result["requests"] == 60
+        assert result["p50_ms"] <= result["p99_ms"]
+
+
+class TestDataset:
+    """Тесты двоичного формата наборов фигур"""
+
+    @pytest.fixture(autouse=True)
+    def numpy(self):
+        return pytest.importorskip("numpy")
+
+    def test_stream_write_and_mmap_read(self, tmp_path, numpy):
+        """Тест потоковой записи блоками и представлений без копирования"""
+        import dataset
+        path = str(tmp_path / "shapes.bin")
+        shapes = [Rectangle(i, 2) for i in range(1, 6)] + [Triangle(3, 4, 5), Trapezoid(2, 8, 4)]
+        with dataset.DatasetWriter(path, block_rows=2) as writer:
+            for shape in shapes:
+                writer.write_shape(shape)
+
+        with dataset.Dataset(path) as data:
+            assert len(data) == 7
+            assert data.counts() == {"Rectangle": 5, "Triangle": 1, "Trapezoid": 1}
+            assert [len(b) for b in data.iter_blocks("Rectangle")] == [2, 2, 1]
+            block = next(data.iter_blocks("Rectangle"))
+            assert isinstance(block["width"].base, numpy.memmap)
+            assert list(data.column("Rectangle", "area")) == [2, 4, 6, 8, 10]
+            assert numpy.isnan(data.column("Rectangle", "inscribed_radius")[0])
+            array = next(data.iter_blocks("Trapezoid")).to_array()
+            assert array[0].inscribed_radius == Trapezoid(2, 8, 4).inscribed_radius
+
+    def test_rejects_other_files(self, tmp_path):
+        """Тест проверки сигнатуры файла"""
+        import dataset
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"x" * 128)
+        with pytest.raises(ValueError, match="не файл набора"):
+            dataset.Dataset(str(path))
+
+    def test_roundtrip_with_calculations_table(self, tmp_path):
+        """Тест выгрузки из таблицы calculations и обратной загрузки"""
+        import dataset
+        from interface import DatabaseManager
+        path = str(tmp_path / "history.bin")
+        with DatabaseManager(str(tmp_path / "a.db")) as source:
+            source.save_calculations([Rectangle(3, 4), Triangle(3, 4, 5), Rectangle(2, 2)])
+            assert dataset.export_calculations(source, path, block_rows=2) == 3
+            expected = source.get_statistics()["by_shape"]
+        with DatabaseManager(str(tmp_path / "b.db")) as target:
+            assert dataset.import_calculations(target, path) == 3
+            assert target.get_statistics()["by_shape"] == expected
+            assert target.lookup_calculation("Rectangle", (2, 2)) is not None
+
+
+class TestHistoryExport:
+    """Тесты потоковой выгрузки истории"""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        from interface import DatabaseManager
+        with DatabaseManager(str(tmp_path / "export.db")) as db:
+            db.save_calculations([Rectangle(3, 4), Triangle(3, 4, 5), Rectangle(1, 1),
+                                  Trapezoid(5, 7, 4), Rectangle(2, 5)])
+            db._connect().execute("UPDATE calculations SET timestamp = '2024-01-0' || id || ' 12:00:00'")
+            db._connect().commit()
+            yield db
+
+    def test_csv_filters_and_progress(self, db, tmp_path):
+        """Тест CSV с фильтрами по типу и датам и прогрессом по порциям"""
+        import csv
+        from history_export import export_history
+        path = tmp_path / "history.csv"
+        calls = []
+        count = export_history(db, str(path), shape_type="Rectangle", date_from="2024-01-02",
+                               date_to="2024-01-05", batch_size=1,
+                               progress=lambda done, total: calls.append((done, total)))
+        rows = list(csv.DictReader(path.open(encoding="utf-8")))
+        assert count == 2
+        assert [r["id"] for r in rows] == ["3", "5"]
+        assert rows[1]["area"] == "10.0" and rows[1]["inscribed_radius"] == ""
+        assert calls == [(1, 2), (2, 2)]
+        assert db.count_calculations() == 5
+        assert db.count_calculations("Rectangle") == 3
+
+    def test_jsonl_cli(self, db, tmp_path, monkeypatch, capsys):
+        """Тест команды export в JSONL"""
+        import json
+        import interface
+        monkeypatch.setenv("DB_PATH", db.db_name)
+        path = tmp_path / "history.jsonl"
+        interface.main(["export", "--output", str(path), "--quiet"])
+        rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [r["shape_type"] for r in rows] == ["Rectangle", "Triangle", "Rectangle",
+                                                   "Trapezoid", "Rectangle"]
+        assert rows[1]["timestamp"] == "2024-01-02 12:00:00"
+        assert "Выгружено строк: 5" in capsys.readouterr().out
+
+    def test_parquet_row_groups(self, db, tmp_path):
+        """Тест Parquet: порция — группа строк"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        from history_export import export_history
+        path = str(tmp_path / "history.parquet")
+        assert export_history(db, path, batch_size=2) == 5
+        parquet = pq.ParquetFile(path)
+        assert parquet.metadata.num_row_groups == 3
+        assert parquet.read().column("area").to_pylist()[0] == 12.0
+
+
+class TestRetention:
+    """Тесты архивирования и обслуживания БД"""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        from interface import DatabaseManager
+        with DatabaseManager(str(tmp_path / "main.db")) as db:
+            db.save_calculations([Rectangle(i + 1, 2) for i in range(50)]
+                                 + [Triangle(3, 4, 5) for _ in range(30)])
+            # Первые 60 строк — годичной давности
+            db._connect().execute("UPDATE calculations SET timestamp = datetime('now', '-365 days') "
+                                  "WHERE id <= 60")
+            db._connect().commit()
+            yield db
+
+    def test_archive_and_delete(self, db, tmp_path):
+        """Тест переноса старых строк в архив порциями и сверки статистики"""
+        import sqlite3
+        import retention
+        archive = str(tmp_path / "archive.db")
+        result = retention.archive_old(db, 30, archive, batch_size=25, delete_chunk=7)
+        assert result['archived'] == 60 and result['deleted'] == 60
+        assert db.count_calculations() == 20
+        assert db.verify_statistics() == []
+        with sqlite3.connect(archive) as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM calculations ORDER BY id")]
+        assert ids == list(range(1, 61))
+        # Повторный запуск ничего не переносит и не дублирует
+        again = retention.archive_old(db, 30, archive)
+        assert again['archived'] == 0 and again['deleted'] == 0
+
+    def test_archive_id_collision(self, db, tmp_path):
+        """Тест: чужие строки архива с теми же id не приводят к потере данных"""
+        import sqlite3
+        import retention
+        from interface import DatabaseManager
+        archive = str(tmp_path / "archive.db")
+        # Архив уже заполнен из другой БД, id которой тоже начинаются с 1
+        with DatabaseManager(str(tmp_path / "other.db")) as other:
+            other.save_calculations([Trapezoid(5, 7, 4) for _ in range(10)])
+            other._connect().execute("UPDATE calculations SET timestamp = '2000-01-01 00:00:00'")
+            other._connect().commit()
+            assert retention.archive_old(other, 30, archive)['archived'] == 10
+        with pytest.raises(ValueError, match="другие расчеты"):
+            retention.archive_old(db, 30, archive)
+        assert db.count_calculations() == 80
+        with sqlite3.connect(archive) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM calculations").fetchone()[0] == 10
+
+    def test_rerun_after_interrupted_delete(self, db, tmp_path):
+        """Тест: строки, скопированные прошлым запуском, удаляются без дублей"""
+        import sqlite3
+        import retention
+        archive = str(tmp_path / "archive.db")
+        retention.archive_old(db, 30, archive)
+        # Как если бы запуск прервался после копирования, до удаления
+        with sqlite3.connect(archive) as conn:
+            rows = conn.execute("SELECT shape_type, parameters, area, timestamp "
+                                "FROM calculations WHERE id <= 5").fetchall()
+        db._connect().executemany("INSERT INTO calculations (shape_type, parameters, area, timestamp) "
+                                  "VALUES (?, ?, ?, ?)", rows)
+        db._connect().execute("UPDATE calculations SET id = id - 80 WHERE id > 80")
+        db._connect().commit()
+        result = retention.archive_old(db, 30, archive)
+        assert result['archived'] == 0 and result['deleted'] == 5
+        assert db.verify_statistics() == []
+
+    def test_delete_only_and_vacuum(self, db):
+        """Тест удаления без архива и возврата свободных страниц"""
+        import retention
+        db._connect().executemany("INSERT INTO calculations (shape_type, parameters, area, timestamp) "
+                                  "VALUES ('Rectangle', ?, 1.0, datetime('now', '-100 days'))",
+                                  [('x' * 500,) for _ in range(2000)])
+        db._connect().commit()
+        result = retention.archive_old(db, 30, None)
+        assert result['archived'] == 0 and result['deleted'] == 2060
+        maintenance = retention.maintain(db)
+        assert maintenance['incremental']
+        assert maintenance['free_pages_before'] > 0 and maintenance['free_pages_after'] == 0
+        assert db.verify_statistics() == []
+
+    def test_cli(self, db, tmp_path, monkeypatch, capsys):
+        """Тест команды retention"""
+        import interface
+        monkeypatch.setenv("DB_PATH", db.db_name)
+        interface.main(["retention", "--days", "30", "--archive", str(tmp_path / "a.db")])
+        assert "перенесено в архив 60, удалено 60" in capsys.readouterr().out
+        assert db.count_calculations() == 20
+
+
+class TestConcurrency:
+    """Тесты одновременного доступа нескольких соединений и процессов"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        from interface import DatabaseManager
+        path = str(tmp_path / "shared.db")
+        DatabaseManager(path).close()
+        return path
+
+    def test_retry_on_busy(self, path):
+        """Тест повтора записи, пока другое соединение держит блокировку"""
+        import sqlite3
+        import threading
+        from database import DatabaseManager
+        holder = sqlite3.connect(path, check_same_thread=False)
+        holder.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.2, holder.commit).start()
+        with DatabaseManager(path, pragmas={'busy_timeout': 0}) as db:
+            assert db.save_shape(Rectangle(3, 4)) == 1
+            assert db.busy_retry_count > 0
+        holder.close()
+
+    def test_busy_without_retries(self, path):
+        """Тест: без повторов SQLITE_BUSY доходит до вызывающего"""
+        import sqlite3
+        from database import DatabaseManager, is_busy_error
+        holder = sqlite3.connect(path)
+        holder.execute("BEGIN IMMEDIATE")
+        with DatabaseManager(path, pragmas={'busy_timeout': 0}, busy_retries=0) as db:
+            with pytest.raises(sqlite3.OperationalError) as error:
+                db.save_shape(Rectangle(3, 4))
+        assert is_busy_error(error.value)
+        holder.rollback()
+        holder.close()
+
+    def test_snapshot(self, path):
+        """Тест: внутри снимка не видны записи других соединений"""
+        from database import DatabaseManager
+        with DatabaseManager(path) as reader, DatabaseManager(path) as writer:
+            writer.save_shape(Rectangle(1, 2))
+            with reader.snapshot():
+                writer.save_calculations([Triangle(3, 4, 5), Rectangle(2, 2)])
+                assert reader.count_calculations() == 1
+                assert len(reader.get_all_calculations()) == 1
+                assert reader.get_statistics()['total'] == 1
+            assert reader.count_calculations() == 3
+
+    def test_write_inside_snapshot_rejected(self, path):
+        """Тест: запись внутри снимка — ошибка, снимок не завершается"""
+        from database import DatabaseManager
+        with DatabaseManager(path) as db:
+            db.save_shape(Rectangle(1, 2))
+            with db.snapshot() as conn:
+                with pytest.raises(RuntimeError):
+                    db.save_shape(Rectangle(3, 4))
+                with pytest.raises(RuntimeError):
+                    db.save_calculations([Rectangle(3, 4)])
+                assert conn.in_transaction
+            db.save_shape(Rectangle(3, 4))
+            assert db.count_calculations() == 2
+
+    def test_verify_statistics_inside_snapshot(self, path):
+        """Тест сверки статистики внутри снимка: снимок вызывающего не завершается"""
+        from database import DatabaseManager
+        with DatabaseManager(path) as db:
+            db.save_shape(Rectangle(1, 2))
+            with db.snapshot() as conn:
+                assert db.verify_statistics() == []
+                assert conn.in_transaction
+                db._connect().execute("UPDATE calculation_stats SET count = 5")
+                assert db.verify_statistics()
+                with pytest.raises(RuntimeError):
+                    db.verify_statistics(repair=True)
+                assert conn.in_transaction
+            assert db.verify_statistics() == []
+
+    def test_verify_statistics_repair_retries_on_busy(self, path):
+        """Тест повтора пересборки статистики, пока БД занята другим соединением"""
+        import sqlite3
+        import threading
+        from database import DatabaseManager
+        with DatabaseManager(path, pragmas={'busy_timeout': 0}) as db:
+            db.save_calculations([Rectangle(i + 1, 2) for i in range(5)])
+            db._connect().execute("UPDATE calculation_stats SET count = 1")
+            db._connect().commit()
+            holder = sqlite3.connect(path, check_same_thread=False)
+            holder.execute("BEGIN IMMEDIATE")
+            threading.Timer(0.2, holder.commit).start()
+            assert db.verify_statistics(repair=True)
+            assert db.busy_retry_count > 0
+            assert db.verify_statistics() == []
+            holder.close()
+
+    def test_retention_retries_on_busy(self, path, tmp_path):
+        """Тест повтора порций архивирования, пока БД занята другим соединением"""
+        import sqlite3
+        import threading
+        import retention
+        from database import DatabaseManager
+        with DatabaseManager(path, pragmas={'busy_timeout': 0}) as db:
+            db.save_calculations([Rectangle(i + 1, 2) for i in range(20)])
+            db._connect().execute("UPDATE calculations SET timestamp = '2000-01-01 00:00:00'")
+            db._connect().commit()
+            holder = sqlite3.connect(path, check_same_thread=False)
+            holder.execute("BEGIN IMMEDIATE")
+            threading.Timer(0.2, holder.commit).start()
+            result = retention.archive_old(db, 30, str(tmp_path / "archive.db"), delete_chunk=5)
+            assert result['archived'] == result['deleted'] == 20
+            assert db.busy_retry_count > 0
+            assert retention.maintain(db)['free_pages_after'] == 0
+            holder.close()
+
+    def test_stress_processes(self, path, tmp_path):
+        """Тест нескольких процессов-писателей и читателей: записи не теряются"""
+        from benchmarks.bench_concurrency import run
+        result = run(str(tmp_path / "stress.db"), writers=3, readers=2, rows=100, chunk=5)
+        assert result['written'] == result['attempted'] == 300
+        assert result['write_errors'] == result['read_errors'] == 0
+        assert result['lost'] == result['duplicates'] == result['stats_drift'] == 0
+        assert result['inconsistent_reads'] == 0
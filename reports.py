@@ -0,0 +1,174 @@
+"""Сводный отчёт Word по истории расчетов.
+
+В отличие от GeometryConsoleApp.save_to_word (одна фигура), здесь в один
+документ попадают выбранные строки истории — по интервалу дат, типу фигуры
+и/или количеству — со сводной статистикой в начале.
+
+Таблица истории не строится через table.add_row(): python-docx при этом
+пересчитывает сетку всей таблицы и держит в памяти дерево XML каждой
+ячейки. Вместо этого документ (заголовки, статистика, шапка таблицы)
+собирается python-docx с одной строкой-маркером, а при сохранении маркер
+заменяется строками, которые потоково пишутся из курсора прямо в
+word/document.xml внутри архива .docx. Память не зависит от числа строк.
+"""
+import html
+import os
+import tempfile
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+from database import DatabaseManager, history_filter
+from geometry_package.instrumentation import timed
+
+HEADERS = ("ID", "Тип", "Параметры", "Площадь", "R описанной", "R вписанной", "Время")
+_MARKER = "__HISTORY_ROWS__"
+_DOCUMENT_XML = "word/document.xml"
+
+
+def _filters(date_from: Optional[str], date_to: Optional[str],
+             shape_type: Optional[str], limit: Optional[int]) -> Tuple[str, list]:
+    """Подзапрос выбранных строк истории и его параметры"""
+    where, args = history_filter(shape_type, date_from, date_to)
+    sql = f"""
+        SELECT id, shape_type, parameters, area, circumscribed_radius,
+               inscribed_radius, timestamp
+        FROM calculations {where}
+        ORDER BY timestamp DESC, id DESC
+    """
+    if limit:
+        sql += " LIMIT ?"
+        args.append(limit)
+    return sql, args
+
+
+def _format(value) -> str:
+    if value is None:
+        return "нет"
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+
+def _row_xml(values) -> str:
+    cells = "".join(
+        f'<w:tc><w:p><w:r><w:t xml:space="preserve">{html.escape(_format(v), quote=False)}</w:t></w:r></w:p></w:tc>'
+        for v in values)
+    return f"<w:tr>{cells}</w:tr>"
+
+
+def iter_rows(db: DatabaseManager, batch_size: int = 5000, **filters) -> Iterator[tuple]:
+    """Выбранные строки истории; курсор читается порциями fetchmany"""
+    sql, args = _filters(**filters)
+    cursor = db._connect().execute(sql, args)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def summarize(db: DatabaseManager, **filters) -> list:
+    """(тип, количество, средняя, мин., макс. площадь) по выбранным строкам"""
+    sql, args = _filters(**filters)
+    return db._connect().execute(f"""
+        SELECT shape_type, COUNT(*), AVG(area), MIN(area), MAX(area)
+        FROM ({sql}) GROUP BY shape_type ORDER BY shape_type
+    """, args).fetchall()
+
+
+@timed("word.export_history_report")
+def export_history_report(db: DatabaseManager, path: Optional[str] = None,
+                          date_from: Optional[str] = None, date_to: Optional[str] = None,
+                          shape_type: Optional[str] = None,
+                          limit: Optional[int] = None) -> Tuple[str, int]:
+    """
+    Сводный отчёт по выбранным строкам истории.
+    date_from/date_to — даты 'ГГГГ-ММ-ДД' (включительно).
+    Возвращает (путь к файлу, количество строк в таблице).
+    """
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    filters = dict(date_from=date_from, date_to=date_to, shape_type=shape_type, limit=limit)
+    path = path or f"report_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+
+    doc = Document()
+    doc.add_heading("Отчёт по истории расчётов", 0)
+    p = doc.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    p.add_run(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}").italic = True
+
+    selection = [f"период: {date_from or '…'} — {date_to or '…'}",
+                 f"тип фигуры: {shape_type or 'все'}"]
+    if limit:
+        selection.append(f"не более {limit} последних")
+    doc.add_paragraph("Выборка: " + ", ".join(selection))
+
+    # Сводка и строки таблицы — из одного снимка БД
+    with db.snapshot():
+        doc.add_heading("1. Сводная статистика", level=1)
+        summary = summarize(db, **filters)
+        doc.add_paragraph(f"Всего расчётов: {sum(row[1] for row in summary)}")
+        stats = doc.add_table(rows=1 + len(summary), cols=5)
+        stats.style = "Table Grid"
+        for cell, text in zip(stats.rows[0].cells,
+                              ("Тип", "Количество", "Средняя площадь", "Мин.", "Макс.")):
+            cell.text = text
+        for row, values in zip(stats.rows[1:], summary):
+            for cell, value in zip(row.cells, values):
+                cell.text = _format(value)
+
+        doc.add_heading("2. Расчёты", level=1)
+        table = doc.add_table(rows=2, cols=len(HEADERS))
+        table.style = "Table Grid"
+        for cell, text in zip(table.rows[0].cells, HEADERS):
+            cell.text = text
+        table.rows[1].cells[0].text = _MARKER
+
+        count = _save_streaming(doc, path, iter_rows(db, **filters))
+    return path, count
+
+
+def _save_streaming(doc, path: str, rows) -> int:
+    """Сохранение документа с заменой строки-маркера потоком строк таблицы"""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(suffix=".docx", dir=directory, delete=False) as tmp:
+        template = tmp.name
+    try:
+        doc.save(template)
+        count = 0
+        with zipfile.ZipFile(template) as src, \
+                zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                if item.filename != _DOCUMENT_XML:
+                    dst.writestr(item, src.read(item.filename))
+                    continue
+                xml = src.read(item.filename).decode("utf-8")
+                marker = xml.index(_MARKER)
+                start = xml.rindex("<w:tr", 0, marker)
+                end = xml.index("</w:tr>", marker) + len("</w:tr>")
+                with dst.open(item.filename, "w") as out:
+                    out.write(xml[:start].encode("utf-8"))
+                    for row in rows:
+                        out.write(_row_xml(row).encode("utf-8"))
+                        count += 1
+                    out.write(xml[end:].encode("utf-8"))
+        return count
+    finally:
+        os.remove(template)
+
+
+class ReportWorker:
+    """Фоновое построение отчётов, чтобы не блокировать консоль"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
+
+    def submit(self, db: DatabaseManager, **kwargs) -> Future:
+        """Запуск export_history_report в фоне; Future вернёт (путь, строк)"""
+        return self._executor.submit(export_history_report, db, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
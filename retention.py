@@ -0,0 +1,172 @@
+"""Хранение истории: архивирование старых расчетов и обслуживание БД.
+
+Строки старше N дней переносятся в отдельный файл архива (та же таблица
+calculations с исходными id) и удаляются из рабочей БД. Перенос идёт
+порциями: сначала порция фиксируется в архиве, затем удаляется из рабочей
+таблицы короткими транзакциями по delete_chunk строк, между которыми другие
+процессы успевают записать свои расчеты. Повторный запуск после сбоя
+безопасен: уже перенесённые строки в архиве не дублируются, а удаляются
+только строки, которые есть в архиве. Архив, где под теми же id лежат другие
+расчеты (например, от пересозданной БД), вызывает ошибку до удаления.
+
+После удаления освобождённые страницы возвращаются системе
+(PRAGMA incremental_vacuum), обновляется статистика планировщика (ANALYZE)
+и усекается WAL. Запуск по расписанию, например из cron:
+
+    python interface.py retention --days 90 --archive calculations_archive.db
+"""
+import sqlite3
+import time
+from typing import Callable, List, Optional
+
+from database import DatabaseManager
+
+
+def _archive_columns(conn: sqlite3.Connection) -> List[tuple]:
+    """(имя, тип) столбцов рабочей таблицы calculations"""
+    return [(row[1], row[2]) for row in conn.execute("PRAGMA main.table_info(calculations)")]
+
+
+def _attach_archive(conn: sqlite3.Connection, path: str) -> str:
+    """Подключение файла архива и создание в нём таблицы; список столбцов для копирования"""
+    columns = _archive_columns(conn)
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    definitions = ", ".join("id INTEGER PRIMARY KEY" if name == "id" else f"{name} {kind}"
+                            for name, kind in columns)
+    with conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archive.calculations ({definitions})")
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_timestamp "
+                     "ON calculations(timestamp)")
+    return ", ".join(name for name, _ in columns)
+
+
+# Строка архива совпадает с рабочей по содержимому (повторный запуск после сбоя)
+_SAME_ROW = ("a.shape_type IS m.shape_type AND a.parameters IS m.parameters "
+             "AND a.area IS m.area AND a.timestamp IS m.timestamp")
+
+
+def _copy_to_archive(conn: sqlite3.Connection, columns: str, first_id: int, last_id: int,
+                     cutoff: str) -> int:
+    """
+    Копирование порции в архив; возвращает число новых строк архива.
+    Строки, уже перенесённые прошлым запуском, пропускаются, а другая строка
+    с тем же id (архив от другой или пересозданной БД) — ошибка: без неё
+    рабочая строка была бы удалена, не попав в архив.
+    """
+    conflicts = conn.execute(f"""
+        SELECT m.id FROM main.calculations m JOIN archive.calculations a ON a.id = m.id
+        WHERE m.id BETWEEN ? AND ? AND m.timestamp < ? AND NOT ({_SAME_ROW})
+        LIMIT 5
+    """, (first_id, last_id, cutoff)).fetchall()
+    if conflicts:
+        raise ValueError(f"В архиве уже есть другие расчеты с id "
+                         f"{', '.join(str(row[0]) for row in conflicts)}: "
+                         f"архив создан для другой БД")
+    return conn.execute(f"""
+        INSERT INTO archive.calculations ({columns})
+        SELECT {columns} FROM main.calculations m
+        WHERE id BETWEEN ? AND ? AND timestamp < ?
+          AND NOT EXISTS (SELECT 1 FROM archive.calculations a WHERE a.id = m.id)
+    """, (first_id, last_id, cutoff)).rowcount
+
+
+# Порции переноса — отдельные транзакции, при SQLITE_BUSY они повторяются целиком
+def _copy_batch(conn: sqlite3.Connection, columns: str, first_id: int, last_id: int,
+                cutoff: str) -> int:
+    with conn:
+        return _copy_to_archive(conn, columns, first_id, last_id, cutoff)
+
+
+def _delete_chunk(conn: sqlite3.Connection, delete: str, first_id: int, last_id: int,
+                  cutoff: str) -> int:
+    with conn:
+        return conn.execute(delete, (first_id, last_id, cutoff)).rowcount
+
+
+def archive_old(db: DatabaseManager, days: int, archive_path: Optional[str],
+                batch_size: int = 10_000, delete_chunk: int = 1_000, pause: float = 0.0,
+                progress: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    Перенос расчетов старше days дней в архив (archive_path=None — только удаление).
+    Каждая порция из batch_size строк сначала фиксируется в архиве, затем
+    удаляется транзакциями по delete_chunk строк с паузой pause секунд.
+    ValueError, если в архиве под теми же id лежат другие расчеты.
+    Возвращает сводку: перенесено, удалено, граница времени, секунды.
+    """
+    if days < 0 or batch_size <= 0 or delete_chunk <= 0:
+        raise ValueError("Параметры хранения должны быть положительными")
+    db.flush()
+    conn = db._connect()
+    start = time.perf_counter()
+    # Граница — в формате столбца timestamp (UTC)
+    cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{days} days",)).fetchone()[0]
+    columns = _attach_archive(conn, archive_path) if archive_path else None
+    delete = "DELETE FROM main.calculations WHERE id BETWEEN ?1 AND ?2 AND timestamp < ?3"
+    if columns:
+        # Удаляются только строки, которые точно лежат в архиве
+        delete += " AND id IN (SELECT id FROM archive.calculations WHERE id BETWEEN ?1 AND ?2)"
+    archived = deleted = 0
+    last_id = 0
+    try:
+        while True:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM calculations WHERE id > ? AND timestamp < ? ORDER BY id LIMIT ?",
+                (last_id, cutoff, batch_size))]
+            if not ids:
+                break
+            last_id = ids[-1]
+            if columns:
+                archived += db._run_with_retry(_copy_batch, conn, columns, ids[0], ids[-1], cutoff)
+            for i in range(0, len(ids), delete_chunk):
+                part = ids[i:i + delete_chunk]
+                deleted += db._run_with_retry(_delete_chunk, conn, delete, part[0], part[-1], cutoff)
+                if pause:
+                    time.sleep(pause)
+            if progress:
+                progress(deleted)
+    finally:
+        if columns:
+            conn.execute("DETACH DATABASE archive")
+    return {'archived': archived, 'deleted': deleted, 'cutoff': cutoff,
+            'seconds': time.perf_counter() - start}
+
+
+def maintain(db: DatabaseManager, vacuum_pages: int = 0, full_vacuum: bool = False) -> dict:
+    """
+    Обслуживание после удаления: возврат свободных страниц, ANALYZE, усечение WAL.
+    vacuum_pages — не больше стольких страниц за запуск (0 — все свободные).
+    full_vacuum — однократно перевести старую БД в auto_vacuum=INCREMENTAL
+    полным VACUUM (долго и блокирует запись).
+    """
+    conn = db._connect()
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if full_vacuum and mode != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        db._run_with_retry(conn.execute, "VACUUM")
+    elif mode == 2 and free_before:
+        # Через execute() прагма выполняет лишь один шаг (одну страницу),
+        # executescript() доводит её до конца
+        pages = min(int(vacuum_pages), free_before) if vacuum_pages > 0 else free_before
+        db._run_with_retry(conn.executescript, f"PRAGMA incremental_vacuum({pages});")
+    db._run_with_retry(conn.execute, "ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return {
+        'free_pages_before': free_before,
+        'free_pages_after': conn.execute("PRAGMA freelist_count").fetchone()[0],
+        'page_count': conn.execute("PRAGMA page_count").fetchone()[0],
+        'incremental': conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2,
+    }
+
+
+def format_summary(archive: dict, maintenance: Optional[dict] = None) -> str:
+    """Строка сводки для вывода в консоль"""
+    text = (f"Старше {archive['cutoff']} (UTC): перенесено в архив {archive['archived']}, "
+            f"удалено {archive['deleted']}, {archive['seconds']:.2f} с")
+    if maintenance:
+        text += (f"\nСвободных страниц: {maintenance['free_pages_before']} -> "
+                 f"{maintenance['free_pages_after']}, всего страниц: {maintenance['page_count']}")
+        if not maintenance['incremental']:
+            text += ("\nБД создана без auto_vacuum=INCREMENTAL: место вернётся после "
+                     "однократного запуска с --full-vacuum")
+    return text
@@ -0,0 +1,194 @@
+"""Локальный HTTP/JSON-сервис расчёта фигур на asyncio (только stdlib).
+
+    POST /calculate  {"shape": "Triangle", "a": 3, "b": 4, "c": 5}
+                     {"shapes": [{...}, {...}]}  — пакет
+    GET  /health
+
+Запись в формате пакетного режима (см. batch_processing). Ответ на одну
+фигуру — {"shape", "parameters", "area", "circumscribed_radius",
+"inscribed_radius"} или 400 с {"error"}; на пакет — {"results": [...]},
+где у ошибочных записей вместо характеристик "error".
+
+Расчёт выполняется в пуле (потоке или процессах при workers > 1), запись
+в БД — в отдельном потоке, поэтому цикл событий не блокируется. Ответ
+отправляется после сохранения результатов.
+
+Запуск: python interface.py serve [--host 127.0.0.1] [--port 8080] [--workers N]
+"""
+import asyncio
+import json
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import batch_processing
+from batch_processing import RESULT_FIELDS
+from database import DatabaseManager
+
+MAX_BODY = 10 * 1024 * 1024
+MAX_BATCH = 10_000
+MAX_HEADERS = 64 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def calculate_records(records: List[dict]) -> List[Tuple[Optional[tuple], Optional[str]]]:
+    """
+    Характеристики записей: [(строка shape_to_row() или None, ошибка или None)].
+    Выполняется в пуле, в том числе в процессах.
+    """
+    chunk = list(enumerate(records))
+    codes, params, accepted, rejected = batch_processing.encode_chunk(chunk)
+    metrics, failed = batch_processing.compute_chunk(codes, params)
+    for position, message in failed:
+        rejected[accepted[position]] = message
+    rows = dict(zip(accepted, batch_processing.decode_rows(codes, params, metrics)))
+    return [(None, rejected[i]) if i in rejected else (rows[i], None)
+            for i in range(len(records))]
+
+
+def _result(row: tuple) -> dict:
+    return dict(zip(RESULT_FIELDS[1:], row))
+
+
+class CalculationService:
+    """HTTP-сервис расчётов; db=None — без сохранения в БД"""
+
+    def __init__(self, db: Optional[DatabaseManager] = None, workers: int = 1):
+        self.db = db
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor: Executor = ProcessPoolExecutor(workers)
+        else:
+            self.executor = ThreadPoolExecutor(1, thread_name_prefix="calculate")
+        # Один поток записи: соединение SQLite и порядок сохранения
+        self.db_executor = ThreadPoolExecutor(1, thread_name_prefix="db")
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> int:
+        """Запуск сервера; возвращает фактический порт (port=0 — любой свободный)"""
+        self.server = await asyncio.start_server(self._client, host, port,
+                                                 limit=MAX_HEADERS)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8080):
+        port = await self.start(host, port)
+        print(f"Сервис расчётов: http://{host}:{port}/calculate")
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown()
+        self.db_executor.shutdown()
+
+    # ---------------- Обработка запросов -----------------
+    async def calculate(self, payload) -> Tuple[int, dict]:
+        """Ответ (статус, тело) на разобранное тело POST /calculate"""
+        batch = isinstance(payload, dict) and "shapes" in payload
+        records = payload["shapes"] if batch else [payload]
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise HTTPError(400, "Ожидается объект фигуры или {\"shapes\": [...]}")
+        if len(records) > MAX_BATCH:
+            raise HTTPError(413, f"В пакете не больше {MAX_BATCH} фигур")
+
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self.executor, calculate_records, records)
+        rows = [row for row, _ in results if row is not None]
+        if self.db is not None and rows:
+            await loop.run_in_executor(self.db_executor, self.db.save_calculations, rows)
+
+        if not batch:
+            row, error = results[0]
+            return (400, {"error": error}) if error else (200, _result(row))
+        return 200, {"results": [{"error": error} if error else _result(row)
+                                 for row, error in results]}
+
+    async def _handle(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path != "/calculate":
+            raise HTTPError(404, f"Неизвестный путь: {path}")
+        if method != "POST":
+            raise HTTPError(405, "Ожидается POST")
+        try:
+            payload = json.loads(body)
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPError(400, "Тело запроса должно быть JSON")
+        return await self.calculate(payload)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Соединение клиента; поддерживается keep-alive"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "Слишком большие заголовки"}, False)
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, version = (lines[0].split(" ") + ["", ""])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and version == "HTTP/1.1")
+                try:
+                    length = int(headers.get("content-length", "0"))
+                    if length > MAX_BODY:
+                        raise HTTPError(413, "Слишком большое тело запроса")
+                    body = await reader.readexactly(length) if length else b""
+                    status, response = await self._handle(method, path.split("?")[0], body)
+                except HTTPError as e:
+                    status, response = e.status, {"error": str(e)}
+                    keep_alive = keep_alive and e.status != 413
+                except ValueError:
+                    status, response, keep_alive = 400, {"error": "Некорректный запрос"}, False
+                except Exception as e:
+                    status, response = 500, {"error": f"{type(e).__name__}: {e}"}
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, body: dict, keep_alive: bool):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+            + data)
+        await writer.drain()
+
+
+def run_service(host: str = "127.0.0.1", port: int = 8080, workers: int = 1,
+                db: Optional[DatabaseManager] = None):
+    """Запуск сервиса до Ctrl+C"""
+    service = CalculationService(db, workers)
+
+    async def main():
+        try:
+            await service.serve_forever(host, port)
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass